@@ -0,0 +1,122 @@
+import heapq
+from array import array
+
+# Inflation of the heuristic for each round, in quarters: 3, 2, 1.5, 1.25 and
+# finally 1, where the route found is a shortest one
+WEIGHTS = (12, 8, 6, 5, 4)
+WEIGHT_SCALE = 4
+# Expansions one call may spend, which bounds the time planning takes per tick
+EXPANSION_BUDGET = 1500
+
+
+# Anytime planner: restarting weighted A* (in the spirit of ARA*) that spends
+# at most a fixed number of expansions per call. Early rounds inflate the
+# heuristic, so a usable route turns up after few expansions; each later
+# round lowers the weight and hands back a shorter route, until the last one
+# is exact. A route found with weight w is at most w times the shortest.
+#
+# The search grows from the goal towards the agent, so every cell in the tree
+# has a route to the goal through its parents. The agent can start walking
+# on an early route and still take a later one from wherever it has got to.
+# The state lives in arrays of its own, so other searches on the same
+# GridSearch can run between calls.
+class AnytimeSearch:
+    def __init__(self, grid):
+        self.grid = grid
+        self.g = array('i', bytes(4 * grid.size))
+        self.parent = array('i', bytes(4 * grid.size))
+        self.seen = array('I', bytes(4 * grid.size))
+        self.closed = array('I', bytes(4 * grid.size))
+        self.stamp = 0
+        self.goal = None
+        self.version = None
+        self.round = 0
+        self.finished = True
+        self.heap = []
+        self.target = None
+
+    def reset(self, goal, start, version):
+        # Start over for goal from the first round. The GridSearch mask must
+        # be synced with the belief map that has `version`.
+        self.goal = goal
+        self.version = version
+        self.round = 0
+        self.finished = False
+        self.begin(self.grid.index(start))
+
+    def begin(self, target):
+        self.stamp += 1
+        goal_idx = self.grid.index(self.goal)
+        self.target = target
+        self.g[goal_idx] = 0
+        self.parent[goal_idx] = -1
+        self.seen[goal_idx] = self.stamp
+        self.heap = [goal_idx]
+
+    def advance(self, start, budget=EXPANSION_BUDGET):
+        # Spend up to `budget` expansions. When a round ends, returns the
+        # route from start to the goal found in it and begins the next round
+        # towards start; otherwise returns []. None means the goal cannot be
+        # reached at all.
+        if self.finished:
+            return []
+        reached = self.expand(budget)
+        if reached is None:
+            self.finished = True
+            return None
+        if not reached:
+            return []
+        route = self.route(self.grid.index(start))
+        if self.round + 1 < len(WEIGHTS):
+            self.round += 1
+            self.begin(self.grid.index(start))
+        else:
+            self.finished = True
+        return route
+
+    def expand(self, budget):
+        # True once the target is reached, False when the budget ran out
+        # first, None when the open list is empty
+        grid = self.grid
+        blocked, offsets, stride, size = grid.blocked, grid.offsets, grid.stride, grid.size
+        g, parent, seen, closed, stamp = self.g, self.parent, self.seen, self.closed, self.stamp
+        heap, target, weight = self.heap, self.target, WEIGHTS[self.round]
+        ty, tx = divmod(target, stride)
+        while budget > 0:
+            if not heap:
+                return None
+            current = heapq.heappop(heap) % size
+            if closed[current] == stamp:
+                continue
+            closed[current] = stamp
+            if current == target:
+                return True
+            budget -= 1
+
+            new_g = g[current] + 1
+            for offset in offsets:
+                neighbor = current + offset
+                # The target may be a believed obstacle the agent stands on
+                if (blocked[neighbor] and neighbor != target) or closed[neighbor] == stamp:
+                    continue
+                if seen[neighbor] == stamp and g[neighbor] <= new_g:
+                    continue
+                seen[neighbor] = stamp
+                g[neighbor] = new_g
+                parent[neighbor] = current
+                ny, nx = divmod(neighbor, stride)
+                f = new_g * WEIGHT_SCALE + weight * (abs(nx - tx) + abs(ny - ty))
+                heapq.heappush(heap, f * size + neighbor)
+        return False
+
+    def route(self, idx):
+        # Cells from idx to the goal through the current tree, or [] when
+        # this round never reached idx
+        if self.seen[idx] != self.stamp:
+            return []
+        parent, position = self.parent, self.grid.position
+        cells = []
+        while idx >= 0:
+            cells.append(position(idx))
+            idx = parent[idx]
+        return cells
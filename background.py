@@ -0,0 +1,116 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathfinding import GridSearch
+from flowfield import FlowField
+from belief import BeliefObstacles
+from tasks import score_tasks
+
+
+# Runs route searches, task scoring and delivery fields on a worker thread so
+# the thread that handles events and draws never waits on one. The worker
+# keeps its own copy of the belief map, brought up to date from the cells
+# each request says changed since the one before, with its own GridSearch and
+# delivery fields over it, so nothing the agent keeps is touched off its
+# thread. Answers come back as futures. Only the latest request is worth
+# answering: a newer one, or shutdown(), sets the stop event of the one
+# before, so its search ends at its next poll and answers None.
+class BackgroundPlanner:
+    def __init__(self, width, height):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="planner")
+        # Only ever used on the submitting thread
+        self.stopped = None
+        self.source = None
+        self.version = None
+        # Only ever used on the worker thread
+        self.beliefs = BeliefObstacles(width, height)
+        self.grid = GridSearch(width, height)
+        self.fields = {}
+
+    def submit_route(self, start, goal, obstacles):
+        return self.submit(obstacles, self.route, start, goal)
+
+    def submit_scan(self, origin, floor, candidates, holes, obstacles):
+        # candidates as for tasks.score_tasks; fields of holes not in holes
+        # are dropped
+        return self.submit(obstacles, self.scan, origin, floor, candidates, holes)
+
+    def submit_delivery(self, pos, holes, obstacles):
+        return self.submit(obstacles, self.delivery, pos, holes)
+
+    def submit(self, obstacles, job, *args):
+        if self.stopped is not None:
+            self.stopped.set()
+        stopped = self.stopped = threading.Event()
+        return self.executor.submit(self.run, stopped, self.changes(obstacles), job, args)
+
+    def changes(self, obstacles):
+        # What the worker's copy is missing: each cell changed since the last
+        # request with its state now, or the whole bitmap when the journal no
+        # longer reaches back that far
+        changes = None
+        if obstacles is self.source:
+            changes = obstacles.changes_since(self.version)
+        self.source, self.version = obstacles, obstacles.version
+        if changes is None:
+            return bytes(obstacles.grid)
+        return [(pos, pos in obstacles) for pos in dict.fromkeys(changes)]
+
+    def run(self, stopped, changes, job, args):
+        # A request stopped before it starts still brings the copy up to
+        # date, since the next one only carries the changes after it
+        self.apply(changes)
+        if stopped.is_set():
+            return None
+        return job(stopped.is_set, *args)
+
+    def apply(self, changes):
+        beliefs = self.beliefs
+        if isinstance(changes, bytes):
+            # A new map restarts the version count the fields refresh from
+            self.beliefs = BeliefObstacles.from_bitmap(beliefs.width, beliefs.height, changes)
+            self.fields.clear()
+            return
+        for pos, blocked in changes:
+            if blocked:
+                beliefs.add(pos)
+            else:
+                beliefs.discard(pos)
+
+    def route(self, stop, start, goal):
+        return self.grid.find_jump_path(start, goal, self.beliefs, stop=stop)
+
+    def field(self, hole_pos):
+        # PlanningAgent.prepare_delivery over the worker's copy
+        self.grid.sync(self.beliefs)
+        field = self.fields.get(hole_pos)
+        if field is None:
+            field = self.fields[hole_pos] = FlowField(self.grid, hole_pos, self.beliefs)
+        else:
+            field.refresh(self.beliefs)
+        return field
+
+    def delivery(self, stop, pos, holes):
+        nearest = min((self.field(hole_pos) for hole_pos in holes), key=lambda field: field.distance(pos))
+        return nearest.path_from(pos)
+
+    def scan(self, stop, origin, floor, candidates, holes):
+        # (task, cost, steps, route to its box), or None
+        for hole_pos in [p for p in self.fields if p not in holes]:
+            del self.fields[hole_pos]
+        scan = score_tasks(self.grid, self.beliefs, origin, floor, candidates,
+                           lambda hole_pos, box_pos: self.field(hole_pos).distance(box_pos))
+        try:
+            while True:
+                next(scan)
+                if stop():
+                    return None
+        except StopIteration as done:
+            found = done.value
+        if found is None:
+            return None
+        return found + (self.grid.path_to(found[0].box_pos),)
+
+    def shutdown(self):
+        if self.stopped is not None:
+            self.stopped.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,120 @@
+from array import array
+from collections import deque
+from collections.abc import MutableSet, Set
+
+
+# Set of believed obstacle cells that counts and journals every change. The
+# cells live in a bytearray the size of the map, one byte per cell, so
+# membership is an index instead of a tuple hash. The version number goes up
+# by one per add/remove, so planners and caches can tell whether their view
+# is stale and replay only the cells that changed. Cells off the map are
+# walls to every planner already and are not stored.
+class BeliefObstacles(MutableSet):
+    def __init__(self, width, height, cells=(), journal_size=4096):
+        self.width = width
+        self.height = height
+        self.grid = bytearray(width * height)
+        self.count = 0
+        self.version = 0
+        self.journal = deque(maxlen=journal_size)
+        for pos in cells:
+            self.add(pos)
+
+    def __contains__(self, pos):
+        x, y = pos
+        return 0 <= x < self.width and 0 <= y < self.height and self.grid[y * self.width + x] == 1
+
+    def __iter__(self):
+        grid, width = self.grid, self.width
+        idx = grid.find(1)
+        while idx >= 0:
+            y, x = divmod(idx, width)
+            yield (x, y)
+            idx = grid.find(1, idx + 1)
+
+    def __len__(self):
+        return self.count
+
+    @classmethod
+    def from_bitmap(cls, width, height, cells):
+        # A map holding the cells of a row-major width*height bitmap (another
+        # map's .grid), at version 0 with an empty journal
+        obstacles = cls(width, height)
+        obstacles.grid[:] = cells
+        obstacles.count = obstacles.grid.count(1)
+        return obstacles
+
+    def __repr__(self):
+        return f"BeliefObstacles({set(self)!r}, version={self.version})"
+
+    def add(self, pos):
+        x, y = pos
+        if 0 <= x < self.width and 0 <= y < self.height:
+            idx = y * self.width + x
+            if not self.grid[idx]:
+                self.grid[idx] = 1
+                self.count += 1
+                self.version += 1
+                self.journal.append(pos)
+
+    def discard(self, pos):
+        x, y = pos
+        if 0 <= x < self.width and 0 <= y < self.height:
+            idx = y * self.width + x
+            if self.grid[idx]:
+                self.grid[idx] = 0
+                self.count -= 1
+                self.version += 1
+                self.journal.append(pos)
+
+    def changes_since(self, version):
+        # Cells whose membership changed after `version`, or None when the
+        # journal no longer reaches back that far and a full resync is needed
+        missing = self.version - version
+        if missing > len(self.journal) or missing < 0:
+            return None
+        start = len(self.journal) - missing
+        return [self.journal[i] for i in range(start, len(self.journal))]
+
+
+# Cells the agent has stood on, with how many separate times it arrived on
+# each (saturating at 65535). The agent records its position every tick, so
+# adding the cell it was last added on again does not count a new visit.
+# Reads like a set of positions for the renderers.
+class VisitCounts(Set):
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.counts = array('H', bytes(2 * width * height))
+        self.visited = 0
+        self.last = None
+
+    def __contains__(self, pos):
+        return self.count(pos) > 0
+
+    def __iter__(self):
+        counts, width = self.counts, self.width
+        for idx in range(len(counts)):
+            if counts[idx]:
+                y, x = divmod(idx, width)
+                yield (x, y)
+
+    def __len__(self):
+        return self.visited
+
+    def count(self, pos):
+        x, y = pos
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.counts[y * self.width + x]
+        return 0
+
+    def add(self, pos):
+        if pos == self.last:
+            return
+        self.last = pos
+        idx = pos[1] * self.width + pos[0]
+        visits = self.counts[idx]
+        if not visits:
+            self.visited += 1
+        if visits < 0xffff:
+            self.counts[idx] = visits + 1
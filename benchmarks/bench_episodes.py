@@ -0,0 +1,171 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(HERE, "baseline_episodes.json")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+ENHANCED_SCENARIOS = ["normal", "persistent", "giving_up", "side_effects", "user_request"]
+CASES = [("base", None)] + [("enhanced", scenario) for scenario in ENHANCED_SCENARIOS]
+KEY_FIELDS = ["variant", "scenario"]
+# Higher is better for throughput, lower for memory
+METRICS = [("ticks_per_s", True), ("decisions_per_s", True), ("peak_kib", False)]
+DEFAULT_THRESHOLD = 1.3
+# Episodes are deterministic, so the same seeds are timed again and again and
+# the fastest pass is kept, which filters out scheduler noise. A case repeats
+# until it has run for MIN_TIME and at least MIN_PASSES times, as in
+# bench_pathfinding, but stops after MAX_PASSES
+MIN_TIME = 2.0
+MIN_PASSES = 3
+MAX_PASSES = 100
+
+
+def load_engine(variant):
+    sys.path.insert(0, ROOT)
+    if variant == "enhanced":
+        sys.path.insert(0, os.path.join(ROOT, "enhanced"))
+    import engine
+    return engine
+
+
+def count_decisions(agent):
+    # A decision is choosing a task (evaluate_tasks, or a speculative choice
+    # taken at the hole) or replanning the route to it (replan, whichever
+    # planner it dispatches to). speculate itself runs on every carrying
+    # tick and is not one. All are wrapped on the instance
+    counter = {"decisions": 0}
+
+    def wrap(name, counts):
+        method = getattr(agent, name)
+
+        def counted(*args, **kwargs):
+            result = method(*args, **kwargs)
+            if counts(result):
+                counter["decisions"] += 1
+            return result
+        setattr(agent, name, counted)
+
+    wrap("evaluate_tasks", lambda result: True)
+    wrap("take_speculation", lambda path: path is not None)
+    wrap("replan", lambda path: True)
+    return counter
+
+
+def make_simulation(engine, scenario, seed):
+    if scenario is None:
+        return engine.Simulation(seed=seed)
+    return engine.Simulation(scenario=scenario, seed=seed)
+
+
+def run_case(variant, scenario, seeds):
+    engine = load_engine(variant)
+    wall = None
+    total = 0.0
+    passes = 0
+    while passes < MAX_PASSES:
+        ticks = decisions = tasks = 0
+        elapsed = 0.0
+        for seed in seeds:
+            sim = make_simulation(engine, scenario, seed)
+            counter = count_decisions(sim.agent)
+            started = time.perf_counter()
+            sim.run()
+            elapsed += time.perf_counter() - started
+            ticks += sim.ticks
+            decisions += counter["decisions"]
+            tasks += sim.agent.tasks_completed
+        wall = elapsed if wall is None else min(wall, elapsed)
+        total += elapsed
+        passes += 1
+        if total >= MIN_TIME and passes >= MIN_PASSES:
+            break
+
+    # Peak memory is taken on a separate run so tracing does not skew the timings
+    tracemalloc.start()
+    make_simulation(engine, scenario, seeds[0]).run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "variant": variant,
+        "scenario": scenario,
+        "episodes": len(seeds),
+        "ticks": ticks,
+        "decisions": decisions,
+        "tasks_completed": tasks,
+        "passes": passes,
+        "wall_seconds": wall,
+        "ticks_per_s": ticks / wall,
+        "decisions_per_s": decisions / wall,
+        "peak_kib": peak / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end headless episode benchmark")
+    parser.add_argument("--episodes", type=int, default=20, help="seeded episodes per case")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench_episodes.json", help="result file, - for stdout")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="fail when a metric is this many times worse than the baseline")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="store this run as the new baseline instead of comparing")
+    parser.add_argument("--case", nargs=2, metavar=("VARIANT", "SCENARIO"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    sys.path.insert(0, HERE)
+    import report
+    seeds = list(range(args.seed, args.seed + args.episodes))
+
+    if args.case:
+        # Child mode: one case per process, since the two variants ship
+        # modules with the same names
+        variant, scenario = args.case
+        result = run_case(variant, None if scenario == "-" else scenario, seeds)
+        json.dump(result, sys.stdout)
+        return
+
+    results = []
+    for variant, scenario in CASES:
+        command = [sys.executable, os.path.abspath(__file__), "--case", variant, scenario or "-",
+                   "--episodes", str(args.episodes), "--seed", str(args.seed)]
+        output = subprocess.run(command, check=True, stdout=subprocess.PIPE, text=True).stdout
+        result = json.loads(output)
+        results.append(result)
+        print(f"{variant} {scenario or ''}: {result['ticks_per_s']:.0f} ticks/s, "
+              f"{result['decisions_per_s']:.0f} decisions/s, {result['peak_kib']:.0f} KiB peak",
+              file=sys.stderr)
+
+    if args.update_baseline:
+        report.save(results, args.baseline)
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+        return
+    report.save(results, args.out)
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline first", file=sys.stderr)
+        sys.exit(2)
+
+    baseline = report.load(args.baseline)
+    failed = []
+    for metric, higher_is_better in METRICS:
+        rows, regressions = report.compare(results, baseline, KEY_FIELDS, metric,
+                                           higher_is_better, args.threshold)
+        report.print_comparison(rows, KEY_FIELDS, metric)
+        failed.extend((metric,) + regression for regression in regressions)
+    if failed:
+        for metric, key, old, new, ratio in failed:
+            label = " ".join(str(part) for part in key if part is not None)
+            print(f"REGRESSION {label} {metric}: {old:.6g} -> {new:.6g} ({ratio:.2f}x worse)",
+                  file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
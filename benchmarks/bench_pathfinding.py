@@ -0,0 +1,305 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+SIZES = [(20, 15), (25, 20), (100, 100), (250, 250), (500, 500), (1000, 1000)]
+# Around the enhanced demo's OBSTACLE_DENSITY of 0.15
+DENSITIES = [0.10, 0.15, 0.20]
+VARIANTS = ["base", "enhanced"]
+PAIRS = 4
+KEY_FIELDS = ["variant", "op", "pathfinder", "width", "height", "density", "goal"]
+# Planners replan() can dispatch to that answer on the calling thread; the
+# budgeted anytime search is timed on its own
+PATHFINDERS = ["jps", "alt", "hpa", "incremental"]
+
+# A case repeats until it has run for MIN_TIME and at least MIN_REPEATS times,
+# but stops after MAX_TIME even if that means a single run
+MIN_TIME = 0.2
+MIN_REPEATS = 3
+MAX_REPEATS = 200
+MAX_TIME = 5.0
+
+
+def load_variant(variant):
+    # Both variants ship modules named agent, constants and utils, so each
+    # variant is benchmarked in its own process with its directory first on the path
+    sys.path.insert(0, ROOT)
+    if variant == "enhanced":
+        sys.path.insert(0, os.path.join(ROOT, "enhanced"))
+    import agent
+    return agent
+
+
+def make_agent(module, start, environment, clock):
+    if hasattr(module, "IntelligentAgent"):
+        return module.IntelligentAgent(start, environment, clock)
+    return module.Agent(start, environment, clock, audio=False)
+
+
+def generate_map(width, height, density, rng):
+    # Random obstacles with the agent's corner free; redrawn until the corner
+    # sits in the big open component so reachable goals can be far away
+    from environment import Environment
+    from pathfinding import GridSearch
+    search = GridSearch(width, height)
+    while True:
+        environment = Environment(width, height)
+        for y in range(height):
+            for x in range(width):
+                if rng.random() < density and (x, y) != (0, 0):
+                    environment.add_obstacle((x, y))
+        levels = list(search.levels((0, 0), environment.obstacles))
+        reached = sum(len(frontier) for _, frontier in levels)
+        if reached * 2 >= environment.size - len(environment.obstacles):
+            far = search.position(levels[-1][1][0])
+            return environment, far
+
+
+def around(pos):
+    x, y = pos
+    return {pos, (x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)}
+
+
+def wall_in(environment, pos):
+    # Surround a free cell with obstacles so no route reaches it
+    for neighbor in around(pos) - {pos}:
+        if environment.in_bounds(neighbor):
+            environment.add_obstacle(neighbor)
+
+
+def find_blocker(agent, goal):
+    # A cell on the agent's route to goal that can be blocked without cutting
+    # goal off, or None
+    path = agent.incremental_pathfind(goal)
+    for pos in path[2:-1]:
+        agent.belief_obstacles.add(pos)
+        reachable = agent.can_reach(goal)
+        agent.belief_obstacles.remove(pos)
+        if reachable:
+            return pos
+    return None
+
+
+def measure(fn, setup=None):
+    times = []
+    total = 0.0
+    while len(times) < MAX_REPEATS:
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        times.append(elapsed)
+        total += elapsed
+        if total >= MAX_TIME or (total >= MIN_TIME and len(times) >= MIN_REPEATS):
+            break
+    return {
+        "repeats": len(times),
+        "mean_us": statistics.fmean(times) * 1e6,
+        "median_us": statistics.median(times) * 1e6,
+        "min_us": min(times) * 1e6,
+    }
+
+
+def free_cell(environment, rng, taken):
+    while True:
+        pos = (rng.randrange(environment.width), rng.randrange(environment.height))
+        if environment.is_free(pos) and pos not in taken:
+            taken.add(pos)
+            return pos
+
+
+def run_variant(variant, sizes, densities, seed):
+    module = load_variant(variant)
+    from simclock import SimClock
+    results = []
+
+    for width, height in sizes:
+        for density in densities:
+            rng = random.Random(f"{seed}/{width}x{height}/{density}")
+            environment, far = generate_map(width, height, density, rng)
+            # Keep the walls clear of the start and the reachable goal
+            hidden = free_cell(environment, rng, around((0, 0)) | around(far))
+            wall_in(environment, hidden)
+            case = {"variant": variant, "width": width, "height": height, "density": density}
+
+            # The agent has already mapped everything, so searches see the
+            # true obstacles; the failed-path cooldown, the D* Lite search and
+            # the enhanced agent's path cache are dropped before each run so
+            # every call really searches
+            agent = make_agent(module, (0, 0), environment, SimClock(125))
+            agent.belief_obstacles |= environment.obstacles
+            cache = getattr(agent, "path_cache", None)
+
+            def cold():
+                agent.failed_attempts.clear()
+                agent.planner = None
+                if cache is not None:
+                    cache.clear()
+
+            # One-off: the HPA* cluster graph is built on the first query
+            started = time.perf_counter()
+            agent.hierarchical_pathfind(far)
+            elapsed_us = (time.perf_counter() - started) * 1e6
+            results.append(dict(case, op="hpa_build", goal=None, repeats=1,
+                                mean_us=elapsed_us, median_us=elapsed_us, min_us=elapsed_us))
+            # Likewise the landmark tables
+            started = time.perf_counter()
+            agent.alt_pathfind((0, 0), far, agent.belief_obstacles)
+            elapsed_us = (time.perf_counter() - started) * 1e6
+            results.append(dict(case, op="alt_build", goal=None, repeats=1,
+                                mean_us=elapsed_us, median_us=elapsed_us, min_us=elapsed_us))
+
+            for goal_kind, goal in (("reachable", far), ("unreachable", hidden)):
+                # Plain A*, the reference the other planners are measured against
+                def pathfind(goal=goal):
+                    return agent.a_star_pathfind((0, 0), goal, agent.belief_obstacles)
+                cold()
+                agent.search.expanded = None
+                steps = max(len(pathfind()) - 1, 0)
+                results.append(dict(case, op="a_star_pathfind", goal=goal_kind,
+                                    steps=steps, expanded=agent.search.expanded,
+                                    **measure(pathfind, setup=cold)))
+                # replan() as the agent calls it, once per planner. Path
+                # quality is compared through the number of steps, and the
+                # flat searches through the nodes they expanded
+                for pathfinder in PATHFINDERS:
+                    agent.pathfinder = pathfinder
+                    cold()
+                    agent.search.expanded = None
+                    steps = max(len(agent.replan(goal)) - 1, 0)
+                    results.append(dict(case, op="replan", pathfinder=pathfinder, goal=goal_kind,
+                                        steps=steps, expanded=agent.search.expanded,
+                                        **measure(lambda goal=goal: agent.replan(goal), setup=cold)))
+                if cache is not None:
+                    agent.replan(goal)
+                    results.append(dict(case, op="replan_cached", goal=goal_kind,
+                                        **measure(lambda goal=goal: agent.replan(goal))))
+                # One anytime call spends one expansion budget whatever the
+                # map; steps is the length of the first route it hands back
+                def restart():
+                    cold()
+                    agent.anytime.goal = None
+
+                cold()
+                route = agent.anytime_pathfind(goal)
+                while not route and agent.planning:
+                    route = agent.anytime_pathfind(goal)
+                if agent.anytime is not None:
+                    results.append(dict(case, op="anytime_pathfind", goal=goal_kind,
+                                        steps=max(len(route) - 1, 0),
+                                        **measure(lambda goal=goal: agent.anytime_pathfind(goal),
+                                                  setup=restart)))
+
+            # D* Lite repairing its search after one belief change on the
+            # route, which is how incremental_pathfind runs on most ticks of
+            # an episode. The changed cell toggles between blocked and free
+            # so every run has a change to repair
+            cold()
+            blocker = find_blocker(agent, far)
+            if blocker is not None:
+                def toggle():
+                    if blocker in agent.belief_obstacles:
+                        agent.belief_obstacles.remove(blocker)
+                    else:
+                        agent.belief_obstacles.add(blocker)
+                    agent.failed_attempts.clear()
+
+                results.append(dict(case, op="incremental_pathfind", goal="reachable",
+                                    **measure(lambda: agent.incremental_pathfind(far), setup=toggle)))
+                agent.belief_obstacles.discard(blocker)
+
+            colors = ["red", "blue", "green", "yellow"][:PAIRS]
+            taken = {(0, 0), far, hidden}
+            boxes = [(free_cell(environment, rng, taken), c) for c in colors]
+            holes = [(free_cell(environment, rng, taken), c) for c in colors]
+            started = time.perf_counter()
+            for pos, color in boxes:
+                agent.notice_box(pos, color)
+            for pos, color in holes:
+                agent.notice_hole(pos, color)
+            # One-off: the flow fields are only built the first time
+            elapsed_us = (time.perf_counter() - started) * 1e6
+            results.append(dict(case, op="notice_pairs", goal=None, repeats=1,
+                                mean_us=elapsed_us, median_us=elapsed_us, min_us=elapsed_us))
+
+            results.append(dict(case, op="evaluate_tasks", goal=None,
+                                **measure(lambda: agent.evaluate_tasks(boxes, holes))))
+            results.append(dict(case, op="select_next_task", goal=None,
+                                **measure(agent.select_next_task,
+                                          setup=lambda: agent.evaluate_tasks(boxes, holes))))
+            if blocker is not None:
+                # The delivery fields and components are repaired first
+                results.append(dict(case, op="evaluate_tasks_changed", goal=None,
+                                    **measure(lambda: agent.evaluate_tasks(boxes, holes), setup=toggle)))
+                agent.belief_obstacles.discard(blocker)
+            # The speculative choice made while carrying a box to a hole
+            hole = holes[0][0]
+            floor = agent.task_index.min_delivery()
+            results.append(dict(case, op="best_task", goal=None,
+                                **measure(lambda: agent.best_task(hole, floor, skip_hole=hole))))
+
+            positions = [free_cell(environment, rng, set()) for _ in range(100)]
+
+            def sense_all():
+                for pos in positions:
+                    agent.pos = pos
+                    agent.sense()
+            sensed = measure(sense_all)
+            for field in ("mean_us", "median_us", "min_us"):
+                sensed[field] /= len(positions)
+            results.append(dict(case, op="sense", goal=None, **sensed))
+            agent.pos = (0, 0)
+            print(f"{variant} {width}x{height} density {density}: done", file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pathfinding and decision micro-benchmarks")
+    parser.add_argument("--variant", choices=VARIANTS + ["all"], default="all")
+    parser.add_argument("--sizes", nargs="+", default=[f"{w}x{h}" for w, h in SIZES],
+                        help="grid sizes as WIDTHxHEIGHT")
+    parser.add_argument("--densities", type=float, nargs="+", default=DENSITIES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench_pathfinding.json", help="result file, - for stdout")
+    parser.add_argument("--compare", metavar="BASELINE", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="exit non-zero when a case is this many times slower than the baseline")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import report
+
+    if args.variant == "all":
+        # One child process per variant; each prints its results as JSON
+        results = []
+        for variant in VARIANTS:
+            command = [sys.executable, os.path.abspath(__file__), "--variant", variant,
+                       "--sizes", *args.sizes, "--densities", *map(str, args.densities),
+                       "--seed", str(args.seed), "--out", "-"]
+            output = subprocess.run(command, check=True, stdout=subprocess.PIPE, text=True).stdout
+            results.extend(json.loads(output)["results"])
+    else:
+        sizes = [tuple(int(n) for n in size.split("x")) for size in args.sizes]
+        results = run_variant(args.variant, sizes, args.densities, args.seed)
+
+    report.save(results, args.out)
+    if args.compare:
+        rows, regressions = report.compare(results, report.load(args.compare), KEY_FIELDS,
+                                           "median_us", threshold=args.threshold)
+        report.print_comparison(rows, KEY_FIELDS, "median_us")
+        if regressions:
+            print(f"{len(regressions)} cases slower than {args.threshold}x the baseline", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import json
+import os
+import platform
+import sys
+import time
+
+
+def metadata():
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def save(results, path):
+    document = {"meta": metadata(), "results": results}
+    if path == "-":
+        json.dump(document, sys.stdout)
+        sys.stdout.write("\n")
+        return
+    with open(path + ".tmp", "w") as f:
+        json.dump(document, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def case_key(result, key_fields):
+    return tuple(result.get(field) for field in key_fields)
+
+
+def compare(results, baseline, key_fields, metric, higher_is_better=False, threshold=None):
+    # Pair each result with the baseline entry of the same case. The ratio is
+    # always "times slower than baseline", so > 1 is a regression whichever
+    # way the metric points. Returns (rows, regressions).
+    previous = {case_key(result, key_fields): result for result in baseline}
+    rows, regressions = [], []
+    for result in results:
+        key = case_key(result, key_fields)
+        old = previous.get(key)
+        if old is None or not old.get(metric) or not result.get(metric):
+            rows.append((key, None, result.get(metric), None))
+            continue
+        ratio = old[metric] / result[metric] if higher_is_better else result[metric] / old[metric]
+        rows.append((key, old[metric], result[metric], ratio))
+        if threshold is not None and ratio > threshold:
+            regressions.append((key, old[metric], result[metric], ratio))
+    return rows, regressions
+
+
+def print_comparison(rows, key_fields, metric):
+    print(f"{' '.join(key_fields)} | baseline {metric} | current | slowdown")
+    for key, old, new, ratio in rows:
+        label = " ".join(str(part) for part in key if part is not None)
+        if ratio is None:
+            print(f"{label}: new case, {new}")
+        else:
+            print(f"{label}: {old:.6g} -> {new:.6g} ({ratio:.2f}x)")
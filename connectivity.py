@@ -0,0 +1,189 @@
+import heapq
+from array import array
+
+
+# Connected components of the free cells of a GridSearch mask, kept up to
+# date from the belief journal so "can the agent get there at all?" is an
+# O(1) question instead of a search that floods the whole component.
+#
+# Every free cell carries a component label, and labels are merged with
+# union-find. A freed cell just unions the labels around it. A new obstacle
+# can only split a component if its free neighbours are not already joined
+# through the ring of eight cells around it. When they are not, two greedy
+# searches race from one neighbour towards another: if they meet, nothing
+# split; if one side runs out of cells first, the cells it saw are a
+# component of their own and get a fresh label. A split therefore costs in
+# proportion to the smaller piece, not to the map.
+class Components:
+    def __init__(self, grid):
+        # The mask starts fully free (an empty belief set at version 0), so
+        # every cell is in component 0
+        self.grid = grid
+        self.label = array('i', bytes(4 * grid.size))
+        self.parent = [0]
+        self.mark = array('I', bytes(4 * grid.size))
+        self.stamp = 0
+        self.version = 0
+
+    def find(self, label):
+        parent = self.parent
+        while parent[label] != label:
+            parent[label] = parent[parent[label]]
+            label = parent[label]
+        return label
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[b] = a
+        return a
+
+    def fresh(self):
+        self.parent.append(len(self.parent))
+        return len(self.parent) - 1
+
+    def rebuild(self):
+        grid = self.grid
+        blocked, offsets = grid.blocked, grid.offsets
+        label = self.label = array('i', [-1]) * grid.size
+        self.parent = []
+        for idx in range(grid.size):
+            if blocked[idx] or label[idx] >= 0:
+                continue
+            component = self.fresh()
+            label[idx] = component
+            frontier = [idx]
+            while frontier:
+                next_frontier = []
+                for current in frontier:
+                    for offset in offsets:
+                        neighbor = current + offset
+                        if not blocked[neighbor] and label[neighbor] < 0:
+                            label[neighbor] = component
+                            next_frontier.append(neighbor)
+                frontier = next_frontier
+
+    def refresh(self, obstacles):
+        # The GridSearch mask must already be synced with `obstacles`
+        if self.version == obstacles.version:
+            return
+        changes = obstacles.changes_since(self.version)
+        self.version = obstacles.version
+        if changes is None:
+            self.rebuild()
+            return
+
+        grid = self.grid
+        blocked, offsets, label = grid.blocked, grid.offsets, self.label
+        changed = {grid.index(pos) for pos in changes if grid.in_bounds(pos)}
+        freed = [idx for idx in changed if not blocked[idx]]
+        for idx in freed:
+            label[idx] = self.fresh()
+        for idx in freed:
+            for offset in offsets:
+                neighbor = idx + offset
+                if not blocked[neighbor]:
+                    self.union(label[idx], label[neighbor])
+
+        # Neighbours of the new obstacles, one per locally joined group,
+        # bucketed by the component they were in
+        groups = {}
+        for idx in changed:
+            if blocked[idx]:
+                for rep in self.local_groups(idx):
+                    groups.setdefault(self.find(label[rep]), {})[rep] = None
+        for reps in groups.values():
+            self.split(list(reps))
+
+    def local_groups(self, idx):
+        # Free neighbours of idx grouped by whether they join up through the
+        # eight surrounding cells; one representative per group
+        blocked, stride = self.grid.blocked, self.grid.stride
+        ring = (idx - stride, idx - stride + 1, idx + 1, idx + stride + 1,
+                idx + stride, idx + stride - 1, idx - 1, idx - stride - 1)
+        free = [not blocked[cell] for cell in ring]
+        if all(free):
+            return [ring[0]]
+        # Walk the ring from a blocked cell so no run of free cells wraps around
+        start = free.index(False)
+        reps = []
+        run_rep = None
+        for step in range(1, 9):
+            i = (start + step) % 8
+            if not free[i]:
+                run_rep = None
+            elif i % 2 == 0 and run_rep is None:
+                run_rep = ring[i]
+                reps.append(run_rep)
+        return reps
+
+    def split(self, reps):
+        # reps are distinct cells that all carry one label; find out which of
+        # them are still joined
+        while len(reps) > 1:
+            a, b = reps[0], reps[1]
+            own, cells = self.race(a, b)
+            if cells is None:
+                reps.pop(1)
+                continue
+            component = self.fresh()
+            for idx in cells:
+                self.label[idx] = component
+            reps = [rep for rep in reps if self.mark[rep] != own]
+
+    def race(self, a, b):
+        # Greedy best-first searches from a towards b and from b towards a,
+        # one expansion each in turn. Returns (stamp, None) when they meet, or
+        # the stamp and cells of the side that ran out first
+        blocked, offsets, stride = self.grid.blocked, self.grid.offsets, self.grid.stride
+        mark = self.mark
+        self.stamp += 2
+        stamps = (self.stamp, self.stamp + 1)
+        targets = (divmod(b, stride), divmod(a, stride))
+        heaps = ([(0, a)], [(0, b)])
+        cells = ([a], [b])
+        mark[a], mark[b] = stamps
+        turn = 0
+        while True:
+            heap = heaps[turn]
+            own, other = stamps[turn], stamps[1 - turn]
+            if not heap:
+                return own, cells[turn]
+            _, current = heapq.heappop(heap)
+            ty, tx = targets[turn]
+            for offset in offsets:
+                neighbor = current + offset
+                if blocked[neighbor]:
+                    continue
+                seen = mark[neighbor]
+                if seen == other:
+                    return own, None
+                if seen == own:
+                    continue
+                mark[neighbor] = own
+                cells[turn].append(neighbor)
+                ny, nx = divmod(neighbor, stride)
+                heapq.heappush(heap, (abs(nx - tx) + abs(ny - ty), neighbor))
+            turn = 1 - turn
+
+    def reachable(self, start, goal):
+        # Whether any route leads from start to goal. Like GridSearch, the
+        # start may be a blocked cell (the agent can always step off it) but
+        # the goal may not.
+        grid = self.grid
+        if not (grid.in_bounds(start) and grid.in_bounds(goal)):
+            return False
+        start_idx, goal_idx = grid.index(start), grid.index(goal)
+        if start_idx == goal_idx:
+            return True
+        blocked, label = grid.blocked, self.label
+        if blocked[goal_idx]:
+            return False
+        component = self.find(label[goal_idx])
+        if not blocked[start_idx]:
+            return self.find(label[start_idx]) == component
+        for offset in grid.offsets:
+            neighbor = start_idx + offset
+            if not blocked[neighbor] and self.find(label[neighbor]) == component:
+                return True
+        return False
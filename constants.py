@@ -3,6 +3,14 @@ GRID_WIDTH = 20
 GRID_HEIGHT = 15
 SCREEN_WIDTH = TILE_SIZE * GRID_WIDTH
 SCREEN_HEIGHT = TILE_SIZE * GRID_HEIGHT
+# Larger maps scroll inside a window of at most this size
+MAX_SCREEN_WIDTH = 1280
+MAX_SCREEN_HEIGHT = 800
+# The window samples the simulation at this frame rate, which runs at
+# SIM_SPEED times real time on its own fixed timestep
+DISPLAY_FPS = 60
+SIM_SPEED = 1.0
+MAX_SIM_SPEED = 100.0
 
 COLORS = {
     'red': (255, 100, 100),
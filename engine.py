@@ -0,0 +1,136 @@
+import random
+from constants import GRID_WIDTH, GRID_HEIGHT, TILE_SIZE, all_possible_colors
+from agent import IntelligentAgent
+from environment import Environment
+from freecells import FreeCells
+from simclock import SimClock
+
+# Simulated milliseconds per tick: 8 ticks per simulated second
+TICK_MS = 125
+
+
+def build_environment(obstacle_count, rng, width=GRID_WIDTH, height=GRID_HEIGHT, tile_size=TILE_SIZE):
+    # Real environment: obstacles anywhere except the agent's start
+    return Environment.generate(width, height, obstacle_count, rng, tile_size)
+
+
+# Display-free episode: simulated time advances a fixed step per tick, so an
+# episode runs as fast as the CPU allows. Rendering is an optional observer.
+# All randomness comes from one seeded generator, so a seed and a tick count
+# determine the episode.
+class Simulation:
+    def __init__(self, obstacle_count=80, max_duration=120_000,
+                 generation_interval=10_000, tick_ms=TICK_MS, seed=None, rng=None,
+                 width=GRID_WIDTH, height=GRID_HEIGHT, tile_size=TILE_SIZE, pathfinder="incremental"):
+        self.max_duration = max_duration
+        self.pathfinder = pathfinder
+        self.generation_interval = generation_interval
+        self.tick_ms = tick_ms
+        self.clock = SimClock(tick_ms)
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.last_generation = 0
+
+        self.environment = build_environment(obstacle_count, self.rng, width, height, tile_size)
+        self.obstacles = self.environment.obstacles
+
+        self.agents = self.create_agents()
+        self.agent = self.agents[0]
+        self.free_cells = FreeCells.reachable(self.environment, [agent.pos for agent in self.agents])
+
+        self.boxes, self.holes = [], []
+        self.spawn_box_hole()
+
+    def create_agents(self):
+        # Pass full environment to the agent
+        return [IntelligentAgent((0, 0), self.environment, self.clock, self.pathfinder)]
+
+    def place(self, container, pos, color):
+        container.append((pos, color))
+        for agent in self.agents:
+            if container is self.boxes:
+                agent.notice_box(pos, color)
+            else:
+                agent.notice_hole(pos, color)
+
+    def spawn_box_hole(self):
+        boxes, holes = self.boxes, self.holes
+        active_colors = {color for _, color in boxes + holes}
+        available_colors = [c for c in all_possible_colors if c not in active_colors]
+        if not available_colors:
+            return
+
+        spawn_count = min(4, len(available_colors))
+        for _ in range(spawn_count):
+            color = available_colors.pop(0)
+
+            # Both cells are taken before either is placed, so a map with
+            # room for only one never gets a box without its hole
+            box_pos = self.free_cells.take(self.rng)
+            hole_pos = self.free_cells.take(self.rng) if box_pos is not None else None
+            if hole_pos is None:
+                if box_pos is not None:
+                    self.free_cells.add(box_pos)
+                return
+            self.place(boxes, box_pos, color)
+            self.place(holes, hole_pos, color)
+
+    @property
+    def time(self):
+        return self.clock.time
+
+    @property
+    def ticks(self):
+        return self.clock.ticks
+
+    @property
+    def finished(self):
+        return self.time > self.max_duration
+
+    def step(self):
+        agent = self.agent
+        if self.time - self.last_generation > self.generation_interval:
+            self.spawn_box_hole()
+            self.last_generation = self.time
+            agent.thought = "New targets spawned."
+
+        agent.update_intelligence(self.boxes, self.holes)
+        agent.execute_movement()
+        # A box or hole that is taken away frees its cell for new spawns
+        if agent.handle_pickup(self.boxes):
+            self.free_cells.add(agent.pos)
+        if agent.handle_drop(self.holes):
+            self.free_cells.add(agent.pos)
+
+        self.clock.advance()
+
+    def finish(self):
+        self.agent.thought = f"Done. Score: {self.agent.efficiency_score}"
+
+    def close(self):
+        # Releases the agents' planner threads; the episode cannot go on after
+        for agent in self.agents:
+            agent.close()
+
+    def run(self, observer=None):
+        # Nothing is drawn between ticks, so background answers are waited
+        # for rather than polled, which keeps the episode repeatable
+        for agent in self.agents:
+            agent.wait_for_worker = True
+        try:
+            while not self.finished:
+                self.step()
+                if observer is not None:
+                    observer(self)
+        finally:
+            self.close()
+        self.finish()
+        return self
+
+
+def run_headless(**kwargs):
+    return Simulation(**kwargs).run()
+
+
+if __name__ == "__main__":
+    sim = run_headless()
+    print(f"{sim.ticks} ticks, {sim.agent.tasks_completed} tasks, score {sim.agent.efficiency_score}")
@@ -1,25 +1,15 @@
-import heapq
 import pygame
 import math
 import os
-import random
-from collections import deque
-from constants import GRID_WIDTH, GRID_HEIGHT
-from utils import Task
-
-class Agent:
-    def __init__(self, start_pos, environment):
-        self.pos = start_pos
-        self.carrying = None
-        self.path = []
-        self.visited_positions = set()
-        self.failed_attempts = {}
-        self.task_queue = []
-        self.current_task = None
-        self.efficiency_score = 0
-        self.tasks_completed = 0
-        self.true_env = environment  
-        self.belief_obstacles = set()
+from constants import PATHFIND_CACHE_SIZE
+from utils import Task, LRUCache, PerformanceMetrics
+from planning import PlanningAgent
+
+class Agent(PlanningAgent):
+    def __init__(self, start_pos, environment, clock, audio=True, pathfinder="incremental"):
+        super().__init__(start_pos, environment, clock, pathfinder, Task)
+        self.metrics = PerformanceMetrics()
+        self.path_cache = LRUCache(PATHFIND_CACHE_SIZE)
         
         self.commitment_intensity = 0
         self.frustration_level = 0
@@ -48,7 +38,8 @@ class Agent:
         self.sounds = {}
         self.sound_enabled = False
         self.current_boxes = []
-        self.load_audio_files()
+        if audio:
+            self.load_audio_files()
 
     def load_audio_files(self):
         try:
@@ -134,6 +125,8 @@ class Agent:
         self.play_frustration_sound(self.frustration_level + 3)
 
     def show_giving_up_through_behavior(self):
+        if self.current_task:
+            self.metrics.tasks_failed += 1
         self.giving_up_animation = 120
         self.agent_size_multiplier = 0.3
         self.current_task = None
@@ -177,7 +170,7 @@ class Agent:
     def update_visual_effects(self):
         if self.bouncing_excitedly:
             bounce_intensity = 8
-            self.bounce_offset = math.sin(pygame.time.get_ticks() * 0.02) * bounce_intensity
+            self.bounce_offset = math.sin(self.clock.time * 0.02) * bounce_intensity
         else:
             self.bounce_offset = 0
         
@@ -186,51 +179,23 @@ class Agent:
 
     def sense(self):
         x, y = self.pos
+        width, height, cells = self.true_env.width, self.true_env.height, self.true_env.cells
+        # The belief bitmap is laid out like the true map, so a cell is only
+        # touched through the set API when the two disagree
+        beliefs = self.belief_obstacles.grid
         obstacle_found = False
         for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
             nx, ny = x + dx, y + dy
-            if 0 <= nx < GRID_WIDTH and 0 <= ny < GRID_HEIGHT:
-                if self.true_env[ny][nx] == 1:
-                    if (nx, ny) not in self.belief_obstacles:
+            if 0 <= nx < width and 0 <= ny < height:
+                idx = ny * width + nx
+                if cells[idx] != beliefs[idx]:
+                    if cells[idx] == 1:
                         obstacle_found = True
-                    self.belief_obstacles.add((nx, ny))
-                elif (nx, ny) in self.belief_obstacles:
-                    self.belief_obstacles.remove((nx, ny))
+                        self.belief_obstacles.add((nx, ny))
+                    else:
+                        self.belief_obstacles.remove((nx, ny))
         return obstacle_found
 
-    def manhattan_distance(self, pos1, pos2):
-        return abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1])
-
-    def a_star_pathfind(self, start, goal, obstacles):
-        if start == goal:
-            return [start]
-        path_key = (start, goal)
-        if path_key in self.failed_attempts and pygame.time.get_ticks() - self.failed_attempts[path_key] < 5000:
-            return []
-
-        heap = [(0, 0, start, [start])]
-        visited = set()
-
-        while heap:
-            f_score, g_score, current, path = heapq.heappop(heap)
-            if current in visited:
-                continue
-            visited.add(current)
-            if current == goal:
-                return path
-
-            for dx, dy in [(-1,0),(1,0),(0,-1),(0,1)]:
-                nx, ny = current[0]+dx, current[1]+dy
-                neighbor = (nx, ny)
-                if (0 <= nx < GRID_WIDTH and 0 <= ny < GRID_HEIGHT and
-                        neighbor not in obstacles and neighbor not in visited):
-                    new_g = g_score + 1
-                    h = self.manhattan_distance(neighbor, goal)
-                    heapq.heappush(heap, (new_g + h, new_g, neighbor, path + [neighbor]))
-
-        self.failed_attempts[path_key] = pygame.time.get_ticks()
-        return []
-
     def evaluate_tasks(self, boxes, holes):
         self.current_boxes = boxes
         self.task_queue.clear()
@@ -238,24 +203,34 @@ class Agent:
         if self.user_request_target:
             for box_pos, box_color in boxes:
                 if box_pos == self.user_request_target:
+                    if not self.can_reach(box_pos):
+                        return
                     for hole_pos, hole_color in holes:
                         if hole_color == box_color:
                             self.task_queue.append(Task(0, box_pos, box_color, hole_pos, 0))
                             return
         
-        for box_pos, box_color in boxes:
-            for hole_pos, hole_color in holes:
-                if hole_color == box_color:
-                    dist = self.manhattan_distance(self.pos, box_pos) + self.manhattan_distance(box_pos, hole_pos)
-                    penalty = 50 if (self.pos, box_pos) in self.failed_attempts else 0
-                    self.task_queue.append(Task(dist + penalty, box_pos, box_color, hole_pos, dist))
-        self.task_queue.sort(key=lambda t: t.priority)
-
-    def select_next_task(self):
-        for i, task in enumerate(self.task_queue):
-            if self.a_star_pathfind(self.pos,task.box_pos,self.belief_obstacles):
-                return self.task_queue.pop(i)
-        return None
+        super().evaluate_tasks(boxes, holes)
+
+    def replan(self, goal):
+        # Routes are cached per belief-map version, so any belief change
+        # retires them. A route asked for again from the same cell, such as
+        # after a user request re-targets the current box, skips the search
+        key = (self.pos, goal, self.belief_obstacles.version)
+        cached = self.path_cache.get(key)
+        if cached is not None:
+            self.metrics.pathfinding_cache_hits += 1
+            self.planning = False
+            return list(cached)
+        self.metrics.pathfinding_cache_misses += 1
+        path = super().replan(goal)
+        if not self.planning:
+            self.path_cache.put(key, tuple(path))
+        return path
+
+    def may_speculate(self):
+        # A user request decides the next task, not the delivery search
+        return not self.user_request_target
 
     def update_intelligence(self, boxes, holes):
         self.visited_positions.add(self.pos)
@@ -298,12 +273,17 @@ class Agent:
         obstacle_discovered = self.sense()
 
         if not self.carrying and not self.current_task:
-            self.evaluate_tasks(boxes, holes)
+            path = self.take_speculation(boxes, holes)
+            if path is None:
+                self.evaluate_tasks(boxes, holes)
             self.current_task = self.select_next_task()
             if self.current_task:
                 commitment_level = 10 if self.user_request_target else 6
                 self.show_commitment_through_behavior(commitment_level)
-                self.path = self.a_star_pathfind(self.pos, self.current_task.box_pos, self.belief_obstacles)
+                self.path = path if path is not None else self.task_path(self.current_task)
+                if self.path:
+                    self.path_cache.put((self.pos, self.current_task.box_pos, self.belief_obstacles.version),
+                                        tuple(self.path))
                 self.trail_positions.append(self.pos)
             else:
                 self.agent_size_multiplier = 0.7
@@ -311,15 +291,22 @@ class Agent:
         elif self.carrying and not self.path:
             targets = [h for h in holes if h[1] == self.carrying]
             if targets:
-                target = min(targets, key=lambda h: self.manhattan_distance(self.pos, h[0]))
-                self.path = self.a_star_pathfind(self.pos, target[0], self.belief_obstacles)
-                self.show_commitment_through_behavior(self.commitment_intensity + 3)
-                self.bouncing_excitedly = True
-                
+                self.path = self.delivery_route([h[0] for h in targets])
+                if not self.planning:
+                    self.show_commitment_through_behavior(self.commitment_intensity + 3)
+                    self.bouncing_excitedly = True
+
+        elif self.carrying and self.path:
+            self.speculate(boxes, holes)
         elif not self.path and self.current_task:
-            self.show_persistence_through_behavior()
+            # Ticks spent waiting on a route that is still being planned are
+            # not failed attempts
+            if not self.planning:
+                self.show_persistence_through_behavior()
             if not self.carrying:
-                self.path = self.a_star_pathfind(self.pos, self.current_task.box_pos, self.belief_obstacles)
+                self.path = self.replan(self.current_task.box_pos)
+        elif self.pathfinder == "anytime" and self.current_task and not self.carrying:
+            self.improve_route(self.current_task.box_pos)
 
     def execute_movement(self):
         if self.dramatic_pause:
@@ -331,16 +318,17 @@ class Agent:
         if self.commitment_intensity > 7:
             self.trail_positions.append(self.pos)
 
-        moves_this_frame = self.movement_speed
+        # movement_speed is cells per simulation tick, whatever the frame rate
+        moves_this_tick = self.movement_speed
         moved = False
         
-        for _ in range(moves_this_frame):
+        for _ in range(moves_this_tick):
             if not self.path:
                 break
                 
             next_pos = self.path[0]
             
-            if self.true_env[next_pos[1]][next_pos[0]] == 1:
+            if self.true_env.is_obstacle(next_pos):
                 
                 self.belief_obstacles.add(next_pos)
                 self.path = [] 
@@ -350,6 +338,7 @@ class Agent:
                 return False
 
             self.pos = self.path.pop(0)
+            self.metrics.total_steps_taken += 1
             moved = True
             
         return moved
@@ -360,7 +349,9 @@ class Agent:
                 if b_pos == self.current_task.box_pos and b_color == self.current_task.box_color:
                     self.carrying = b_color
                     boxes.pop(i)
+                    self.task_index.remove_box(b_pos)
                     self.efficiency_score += 10
+                    self.metrics.efficiency_score = self.efficiency_score
                     self.side_effect_reaction = 10  
                     return True
         return False
@@ -370,6 +361,8 @@ class Agent:
             for i, (h_pos, h_color) in enumerate(holes):
                 if self.pos == h_pos and h_color == self.carrying:
                     holes.pop(i)
+                    self.delivery_fields.pop(h_pos, None)
+                    self.task_index.remove_hole(h_pos)
                     carried_color = self.carrying
                     self.carrying = None
                     self.current_task = None
@@ -377,5 +370,7 @@ class Agent:
                     self.show_success_celebration()  
                     self.efficiency_score += 20
                     self.tasks_completed += 1
+                    self.metrics.efficiency_score = self.efficiency_score
+                    self.metrics.tasks_completed = self.tasks_completed
                     return True
         return False
\ No newline at end of file
@@ -0,0 +1,205 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+if __name__ == "__main__":
+    # Run as a script from enhanced/: the modules shared with the base agent
+    # live one directory up, after this directory so ours come first
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants import GRID_WIDTH, GRID_HEIGHT
+from engine import Simulation, scenarios
+from utils import PerformanceMetrics
+
+# Obstacle share of the grid in the interactive demo (70 obstacles)
+DEFAULT_DENSITY = 70 / (GRID_WIDTH * GRID_HEIGHT)
+# An episode that takes its worker down this many times is run on its own
+# and, if it crashes again, recorded as failed instead of retried
+MAX_CRASHES = 2
+
+
+def plan_episodes(count, seed=0, densities=(DEFAULT_DENSITY,), pair_counts=(2,),
+                  scenario_names=scenarios, max_duration=120_000):
+    # `count` seeded maps for every (scenario, density, pairs) combination;
+    # the same seeds are reused across combinations so variants are compared
+    # on the same maps
+    for scenario, density, pairs in itertools.product(scenario_names, densities, pair_counts):
+        for i in range(count):
+            yield {"seed": seed + i, "scenario": scenario, "density": density,
+                   "pair_count": pairs, "max_duration": max_duration}
+
+
+def episode_key(params):
+    return (params["seed"], params["scenario"], params["density"], params["pair_count"],
+            params["max_duration"])
+
+
+def run_episode(params):
+    started = time.perf_counter()
+    sim = Simulation(obstacle_count=round(params["density"] * GRID_WIDTH * GRID_HEIGHT),
+                     max_duration=params["max_duration"], scenario=params["scenario"],
+                     pair_count=params["pair_count"], seed=params["seed"])
+    sim.run()
+    metrics = sim.agent.metrics
+    return dict(params,
+                tasks_completed=metrics.tasks_completed,
+                tasks_failed=metrics.tasks_failed,
+                total_steps_taken=metrics.total_steps_taken,
+                efficiency_score=metrics.efficiency_score,
+                success_rate=metrics.success_rate,
+                steps_per_task=metrics.steps_per_task,
+                ticks=sim.ticks,
+                wall_seconds=time.perf_counter() - started)
+
+
+# Running totals per (scenario, density, pairs), folded into PerformanceMetrics
+# so the aggregate rates are computed exactly as for a single agent
+class Summary:
+    def __init__(self):
+        self.groups = {}
+
+    def add(self, record):
+        key = f"{record['scenario']}/density={record['density']:.3f}/pairs={record['pair_count']}"
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = {"episodes": 0, "errors": 0, "metrics": PerformanceMetrics()}
+        group["episodes"] += 1
+        if "error" in record:
+            group["errors"] += 1
+            return
+        metrics = group["metrics"]
+        metrics.tasks_completed += record["tasks_completed"]
+        metrics.tasks_failed += record["tasks_failed"]
+        metrics.total_steps_taken += record["total_steps_taken"]
+        metrics.efficiency_score += record["efficiency_score"]
+
+    def report(self):
+        report = {}
+        for key, group in sorted(self.groups.items()):
+            metrics = group["metrics"]
+            ran = group["episodes"] - group["errors"]
+            report[key] = {
+                "episodes": group["episodes"],
+                "errors": group["errors"],
+                "tasks_completed": metrics.tasks_completed,
+                "tasks_failed": metrics.tasks_failed,
+                "success_rate": metrics.success_rate,
+                "steps_per_task": metrics.steps_per_task,
+                "mean_efficiency_score": metrics.efficiency_score / ran if ran else 0.0,
+            }
+        return report
+
+    def save(self, path):
+        # Write-then-rename so a reader never sees a half-written summary
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.report(), f, indent=2)
+        os.replace(path + ".tmp", path)
+
+
+def load_results(path):
+    # Records already on disk. A line cut short by a crash of this process is
+    # dropped so new records start on a fresh line.
+    if not os.path.exists(path):
+        return []
+    with open(path, "rb") as f:
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    if end != len(data):
+        with open(path, "r+b") as f:
+            f.truncate(end)
+    return [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+
+
+def run_pool(queue, workers, emit):
+    # Run episodes from the queue until it is empty or a worker dies. Only a
+    # couple of episodes per worker are in flight at a time, so a crash costs
+    # little; returns the episodes lost with the pool.
+    in_flight = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while queue or in_flight:
+            while queue and len(in_flight) < 2 * workers:
+                params = queue.popleft()
+                in_flight[pool.submit(run_episode, params)] = params
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            if any(isinstance(future.exception(), BrokenProcessPool) for future in done):
+                wait(in_flight)
+                break
+            for future in done:
+                params = in_flight.pop(future)
+                if future.exception() is not None:
+                    emit(dict(params, error=repr(future.exception())))
+                else:
+                    emit(future.result())
+
+    lost = []
+    for future, params in in_flight.items():
+        error = future.exception()
+        if isinstance(error, BrokenProcessPool):
+            lost.append(params)
+        elif error is not None:
+            emit(dict(params, error=repr(error)))
+        else:
+            emit(future.result())
+    return lost
+
+
+def run_batch(episodes, out_path, workers=None):
+    # Episodes already recorded in out_path are skipped, so an interrupted
+    # batch resumes where it stopped. Every record is flushed as soon as its
+    # episode finishes and the aggregate summary is rewritten next to it.
+    workers = workers or os.cpu_count() or 1
+    summary_path = os.path.splitext(out_path)[0] + ".summary.json"
+    summary = Summary()
+    finished = set()
+    for record in load_results(out_path):
+        summary.add(record)
+        finished.add(episode_key(record))
+    queue = deque(params for params in episodes if episode_key(params) not in finished)
+    crashes = {}
+
+    with open(out_path, "a") as out:
+        def emit(record):
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            summary.add(record)
+            summary.save(summary_path)
+
+        while queue:
+            for params in run_pool(queue, workers, emit):
+                key = episode_key(params)
+                crashes[key] = crashes.get(key, 0) + 1
+                if crashes[key] < MAX_CRASHES:
+                    queue.appendleft(params)
+                elif run_pool(deque([params]), 1, emit):
+                    emit(dict(params, error="worker crashed"))
+
+    summary.save(summary_path)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run seeded headless episodes across all cores")
+    parser.add_argument("--episodes", type=int, default=100, help="episodes per combination")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--densities", type=float, nargs="+", default=[DEFAULT_DENSITY])
+    parser.add_argument("--pairs", type=int, nargs="+", default=[2])
+    parser.add_argument("--scenarios", nargs="+", default=scenarios, choices=scenarios)
+    parser.add_argument("--duration", type=int, default=120_000, help="simulated ms per episode")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="batch_results.jsonl")
+    args = parser.parse_args()
+
+    episodes = plan_episodes(args.episodes, args.seed, args.densities, args.pairs,
+                             args.scenarios, args.duration)
+    summary = run_batch(episodes, args.out, args.workers)
+    for key, group in summary.report().items():
+        print(f"{key}: {group['episodes']} episodes, {group['errors']} errors, "
+              f"success {group['success_rate']:.1f}%, {group['steps_per_task']:.1f} steps/task, "
+              f"score {group['mean_efficiency_score']:.1f}")
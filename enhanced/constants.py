@@ -4,6 +4,14 @@ GRID_HEIGHT = 20
 SCREEN_WIDTH = TILE_SIZE * GRID_WIDTH + 300  # Extra space for enhanced UI
 SCREEN_HEIGHT = TILE_SIZE * GRID_HEIGHT
 UI_PANEL_WIDTH = 300
+# Larger maps scroll inside a map area of at most this size
+MAX_SCREEN_WIDTH = 1280
+MAX_SCREEN_HEIGHT = 800
+# The window samples the simulation at this frame rate, which runs at
+# SIM_SPEED times real time on its own fixed timestep
+DISPLAY_FPS = 60
+SIM_SPEED = 1.0
+MAX_SIM_SPEED = 100.0
 
 # Enhanced color palette with alpha support
 COLORS = {
@@ -0,0 +1,200 @@
+import os
+import random
+import sys
+
+if __name__ == "__main__":
+    # Run as a script from enhanced/: the modules shared with the base agent
+    # live one directory up, after this directory so ours come first
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants import GRID_WIDTH, GRID_HEIGHT, TILE_SIZE, all_possible_colors
+from agent import Agent
+from environment import Environment
+from freecells import FreeCells
+from simclock import SimClock
+
+# Simulated milliseconds per tick: 12 ticks per simulated second
+TICK_MS = 1000 / 12
+# New boxes and holes appear every 30 simulated seconds
+SPAWN_INTERVAL = 30000
+# The side-effects scenario startles the agent every 2.5 simulated seconds
+SIDE_EFFECT_INTERVAL = 2500
+
+scenarios = [
+    "normal",
+    "persistent",
+    "giving_up",
+    "side_effects"
+]
+
+
+def build_environment(obstacle_count, rng, width=GRID_WIDTH, height=GRID_HEIGHT, tile_size=TILE_SIZE):
+    return Environment.generate(width, height, obstacle_count, rng, tile_size)
+
+
+# Display-free episode with the scenario script of the interactive demo.
+# Simulated time advances a fixed step per tick, so an episode runs as fast
+# as the CPU allows; rendering and input handling are an optional observer.
+# Timed events fire on the tick that crosses their period and all randomness
+# comes from one seeded generator, so a seed and a tick count determine the
+# episode.
+class Simulation:
+    def __init__(self, obstacle_count=70, max_duration=120_000, scenario="normal",
+                 scenario_duration=35000, tick_ms=TICK_MS, audio=False, pair_count=2,
+                 seed=None, rng=None, width=GRID_WIDTH, height=GRID_HEIGHT, tile_size=TILE_SIZE,
+                 pathfinder="incremental"):
+        self.max_duration = max_duration
+        self.pair_count = pair_count
+        self.scenario_duration = scenario_duration
+        self.tick_ms = tick_ms
+        self.clock = SimClock(tick_ms)
+        self.rng = rng if rng is not None else random.Random(seed)
+
+        self.environment = build_environment(obstacle_count, self.rng, width, height, tile_size)
+        self.obstacles = self.environment.obstacles
+
+        self.agent = Agent((0, 0), self.environment, self.clock, audio=audio, pathfinder=pathfinder)
+        # Boxes and holes never spawn on the agent's start
+        self.free_cells = FreeCells.reachable(self.environment, [(0, 0)])
+        self.free_cells.discard((0, 0))
+
+        self.boxes, self.holes = [], []
+        self.spawn_box_hole()
+
+        self.current_scenario = scenario
+        self.scenario_index = scenarios.index(scenario) if scenario in scenarios else 0
+        self.scenario_timer = 0
+
+    def spawn_box_hole(self):
+        boxes, holes = self.boxes, self.holes
+        active_colors = {color for _, color in boxes + holes}
+        available_colors = [c for c in all_possible_colors if c not in active_colors]
+        if not available_colors:
+            return
+
+        spawn_count = min(self.pair_count, len(available_colors))
+        for _ in range(spawn_count):
+            color = available_colors.pop(0)
+
+            # Both cells are taken before either is placed, so a map with
+            # room for only one never gets a box without its hole
+            box_pos = self.free_cells.take(self.rng)
+            hole_pos = self.free_cells.take(self.rng) if box_pos is not None else None
+            if hole_pos is None:
+                if box_pos is not None:
+                    self.free_cells.add(box_pos)
+                return
+            boxes.append((box_pos, color))
+            self.agent.notice_box(box_pos, color)
+            holes.append((hole_pos, color))
+            self.agent.notice_hole(hole_pos, color)
+
+    def next_scenario(self):
+        self.scenario_index = (self.scenario_index + 1) % len(scenarios)
+        self.current_scenario = scenarios[self.scenario_index]
+        self.scenario_timer = self.time
+
+    def request_random_box(self):
+        if self.boxes:
+            box_color = self.rng.choice([color for _, color in self.boxes])
+            self.agent.handle_user_request_behavior(box_color)
+            self.current_scenario = "user_request"
+
+    def cancel_request(self):
+        self.agent.cancel_user_request_behavior()
+        self.current_scenario = "giving_up"
+
+    @property
+    def time(self):
+        return self.clock.time
+
+    @property
+    def ticks(self):
+        return self.clock.ticks
+
+    @property
+    def finished(self):
+        return self.time > self.max_duration
+
+    def apply_scenario(self):
+        agent = self.agent
+        scenario_time = self.time - self.scenario_timer
+
+        if self.current_scenario == "user_request":
+            if scenario_time < 1000 and self.boxes and not agent.user_request_target:
+                box_color = self.rng.choice([color for _, color in self.boxes])
+                agent.handle_user_request_behavior(box_color)
+
+        elif self.current_scenario == "persistent":
+            if agent.current_task and scenario_time > 3000:
+                task_pos = agent.current_task.box_pos
+                surrounding_positions = [
+                    (task_pos[0] + dx, task_pos[1] + dy)
+                    for dx, dy in [(-1,0), (1,0), (0,-1), (0,1), (-1,-1), (1,1), (-1,1), (1,-1)]
+                    if self.environment.in_bounds((task_pos[0] + dx, task_pos[1] + dy))
+                ]
+                for i, pos in enumerate(surrounding_positions):
+                    if i < 6 and pos not in self.obstacles:
+                        agent.belief_obstacles.add(pos)
+
+        elif self.current_scenario == "giving_up":
+            if scenario_time < 500:
+                agent.persistence_attempts = 12
+                agent.show_giving_up_through_behavior()
+
+        elif self.current_scenario == "side_effects":
+            if self.clock.due(SIDE_EFFECT_INTERVAL, since=self.scenario_timer):
+                agent.show_side_effect_reaction()
+                if agent.pos[0] > 0:
+                    agent.belief_obstacles.add((agent.pos[0]-1, agent.pos[1]))
+
+    def step(self):
+        agent = self.agent
+        if self.time - self.scenario_timer > self.scenario_duration:
+            self.next_scenario()
+
+        self.apply_scenario()
+
+        if self.clock.due(SPAWN_INTERVAL):
+            old_box_count = len(self.boxes)
+            self.spawn_box_hole()
+            if len(self.boxes) > old_box_count:
+                agent.bouncing_excitedly = True
+                agent.hesitation_timer = 20
+
+        agent.update_intelligence(self.boxes, self.holes)
+        agent.execute_movement()
+        # A box or hole that is taken away frees its cell for new spawns
+        if agent.handle_pickup(self.boxes):
+            self.free_cells.add(agent.pos)
+        if agent.handle_drop(self.holes):
+            self.free_cells.add(agent.pos)
+
+        self.clock.advance()
+
+    def close(self):
+        # Releases the agent's planner thread; the episode cannot go on after
+        self.agent.close()
+
+    def run(self, observer=None):
+        # Nothing is drawn between ticks, so background answers are waited
+        # for rather than polled, which keeps the episode repeatable
+        self.agent.wait_for_worker = True
+        try:
+            while not self.finished:
+                self.step()
+                if observer is not None:
+                    observer(self)
+        finally:
+            self.close()
+        return self
+
+
+def run_headless(**kwargs):
+    return Simulation(**kwargs).run()
+
+
+if __name__ == "__main__":
+    for scenario in scenarios:
+        sim = run_headless(scenario=scenario)
+        print(f"{scenario}: {sim.ticks} ticks, {sim.agent.tasks_completed} tasks, score {sim.agent.efficiency_score}")
@@ -1,6 +1,7 @@
 from dataclasses import dataclass, field
-from typing import Tuple, List, Dict, Optional, Set
+from typing import Tuple, List, Optional, Set
 from enum import Enum
+from collections import OrderedDict
 import time
 import heapq
 
@@ -55,29 +56,24 @@ class PerformanceMetrics:
 class LRUCache:
     def __init__(self, capacity: int):
         self.capacity = capacity
-        self.cache: Dict = {}
-        self.access_order: List = []
+        self.cache: OrderedDict = OrderedDict()
     
     def get(self, key) -> Optional[List]:
         if key in self.cache:
-            self.access_order.remove(key)
-            self.access_order.append(key)
+            self.cache.move_to_end(key)
             return self.cache[key]
         return None
     
     def put(self, key, value: List):
         if key in self.cache:
-            self.access_order.remove(key)
+            self.cache.move_to_end(key)
         elif len(self.cache) >= self.capacity:
-            oldest = self.access_order.pop(0)
-            del self.cache[oldest]
+            self.cache.popitem(last=False)
         
         self.cache[key] = value
-        self.access_order.append(key)
     
     def clear(self):
         self.cache.clear()
-        self.access_order.clear()
 
 @dataclass
 class GameState:
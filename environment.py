@@ -0,0 +1,42 @@
+# The true world of one run: its dimensions, the tile size it is drawn at and
+# its obstacles. Obstacles live in a flat bytearray (one byte per cell, row
+# major) for O(1) lookups on maps of millions of cells, and in a set for
+# code that walks the obstacles themselves.
+class Environment:
+    def __init__(self, width, height, tile_size=32):
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.cells = bytearray(width * height)
+        self.obstacles = set()
+
+    @property
+    def size(self):
+        return self.width * self.height
+
+    def in_bounds(self, pos):
+        return 0 <= pos[0] < self.width and 0 <= pos[1] < self.height
+
+    def is_obstacle(self, pos):
+        return self.cells[pos[1] * self.width + pos[0]] == 1
+
+    def is_free(self, pos):
+        return self.cells[pos[1] * self.width + pos[0]] == 0
+
+    def add_obstacle(self, pos):
+        self.cells[pos[1] * self.width + pos[0]] = 1
+        self.obstacles.add(pos)
+
+    def random_cell(self, rng):
+        return (rng.randint(0, self.width - 1), rng.randint(0, self.height - 1))
+
+    @classmethod
+    def generate(cls, width, height, obstacle_count, rng, tile_size=32, keep_free=((0, 0),)):
+        environment = cls(width, height, tile_size)
+        keep_free = set(keep_free)
+        obstacle_count = min(obstacle_count, environment.size - len(keep_free))
+        while len(environment.obstacles) < obstacle_count:
+            pos = environment.random_cell(rng)
+            if pos not in keep_free:
+                environment.add_obstacle(pos)
+        return environment
@@ -0,0 +1,353 @@
+import heapq
+from constants import all_possible_colors
+from agent import IntelligentAgent
+from engine import Simulation
+from flowfield import FlowField, UNREACHABLE
+from freecells import FreeCells
+from pathfinding import GridSearch
+from belief import BeliefObstacles
+from tasks import TaskIndex
+from utils import PerformanceMetrics, Task
+
+# How many ticks ahead each agent books its route in the reservation table
+RESERVATION_WINDOW = 8
+
+
+# Space-time reservations: (tick, cell) -> agent. Agents keep the steps they
+# booked for several ticks, so entries are expired tick by tick as time passes.
+class ReservationTable:
+    def __init__(self):
+        self.cells = {}
+        self.by_tick = {}
+
+    def reserve(self, agent, tick, idx):
+        self.cells[(tick, idx)] = agent
+        self.by_tick.setdefault(tick, set()).add(idx)
+
+    def release(self, agent, tick, idx):
+        if self.cells.get((tick, idx)) is agent:
+            del self.cells[(tick, idx)]
+            self.by_tick[tick].discard(idx)
+
+    def expire(self, tick):
+        for old in [t for t in self.by_tick if t < tick]:
+            for idx in self.by_tick.pop(old):
+                self.cells.pop((old, idx), None)
+
+    def owner(self, tick, idx):
+        return self.cells.get((tick, idx))
+
+    def is_free(self, agent, tick, idx):
+        owner = self.cells.get((tick, idx))
+        return owner is None or owner is agent
+
+
+def cooperative_path(grid, start, guide, table, agent, tick, window=RESERVATION_WINDOW):
+    # Windowed space-time A*: states are (cell, ticks ahead), waiting in place
+    # is a move, and cells or swaps booked by other agents are off limits. The
+    # guide's exact distance-to-goal is the heuristic, so an unobstructed agent
+    # walks straight down its route. Returns the cells the agent should occupy
+    # on each of the next ticks (up to the goal or the window), or [] if it
+    # cannot even stay put.
+    start_idx, goal_idx = grid.index(start), guide.goal_idx
+    blocked, offsets, dist = grid.blocked, grid.offsets, guide.dist
+    h = guide.distance(start)
+    if h == UNREACHABLE:
+        return []
+
+    parents = {(start_idx, 0): None}
+    heap = [(h, 0, start_idx)]
+    end = None
+    while heap:
+        _, dt, idx = heapq.heappop(heap)
+        if idx == goal_idx or dt == window:
+            end = (idx, dt)
+            break
+        t = tick + dt + 1
+        for nxt in (idx, idx + offsets[0], idx + offsets[1], idx + offsets[2], idx + offsets[3]):
+            if nxt != idx and (blocked[nxt] or dist[nxt] == UNREACHABLE):
+                continue
+            if (nxt, dt + 1) in parents or not table.is_free(agent, t, nxt):
+                continue
+            if nxt != idx:
+                other = table.owner(t - 1, nxt)
+                if other is not None and other is not agent and table.owner(t, idx) is other:
+                    continue
+            parents[(nxt, dt + 1)] = (idx, dt)
+            heapq.heappush(heap, (dt + 1 + (dist[nxt] if nxt != start_idx else h), dt + 1, nxt))
+    if end is None or end[1] == 0:
+        return []
+
+    cells = []
+    node = end
+    while node[1] > 0:
+        cells.append(grid.position(node[0]))
+        node = parents[node]
+    cells.reverse()
+    return cells
+
+
+# Several agents in one environment. Agents still choose and route their own
+# tasks, but share a claim table so no two chase the same box. They also pool
+# what they sense into one belief map, so each hole needs one delivery field
+# and each box or hole one task index entry for the whole fleet, however many
+# agents there are. The fleet books each agent's next few steps in a
+# space-time reservation table (windowed cooperative A*) and keeps the
+# booking until half of it is used up, the goal changes or a booked cell
+# turns out blocked, so routes never collide.
+class Fleet(Simulation):
+    def __init__(self, agent_count=8, window=RESERVATION_WINDOW, **kwargs):
+        self.agent_count = agent_count
+        self.window = window
+        self.claims = {}
+        self.reservations = ReservationTable()
+        self.plans = {}
+        self.stalled = {}
+        self.guides = {}
+        self.metrics = PerformanceMetrics()
+        super().__init__(**kwargs)
+
+    def create_agents(self):
+        # Start every agent in the region around (0, 0), on a distinct cell
+        cells = FreeCells.reachable(self.environment, [(0, 0)])
+        if len(cells) < self.agent_count:
+            raise ValueError(f"{self.agent_count} agents do not fit in the "
+                             f"{len(cells)} free cells reachable from (0, 0)")
+        cells.discard((0, 0))
+        starts = [(0, 0)]
+        while len(starts) < self.agent_count:
+            starts.append(cells.take(self.rng))
+        width, height = self.environment.width, self.environment.height
+        beliefs = BeliefObstacles(width, height)
+        field_grid = GridSearch(width, height)
+        fields = {}
+        task_index = TaskIndex(Task)
+        agents = []
+        for pos in starts:
+            agent = IntelligentAgent(pos, self.environment, self.clock, self.pathfinder)
+            agent.claims = self.claims
+            agent.belief_obstacles = beliefs
+            agent.field_grid = field_grid
+            agent.delivery_fields = fields
+            agent.task_index = task_index
+            agents.append(agent)
+        return agents
+
+    def spawn_box_hole(self):
+        # Keep at least one open box per agent; colours may repeat across pairs.
+        # Free cells an agent stands on are drawn again, which takes a handful
+        # of draws at most since agents cover a tiny share of the map
+        standing = {agent.pos for agent in self.agents}
+        color_index = len(self.boxes) + len(self.holes)
+        while len(self.boxes) < len(self.agents):
+            color = all_possible_colors[color_index % len(all_possible_colors)]
+            color_index += 1
+            # Both cells are taken before either is placed, as in Simulation
+            box_pos = self.take_cell(standing)
+            hole_pos = self.take_cell(standing) if box_pos is not None else None
+            if hole_pos is None:
+                if box_pos is not None:
+                    self.free_cells.add(box_pos)
+                return
+            self.place(self.boxes, box_pos, color)
+            self.place(self.holes, hole_pos, color)
+
+    def take_cell(self, standing):
+        # A free cell nobody stands on, or None after 50 draws without one
+        for _ in range(50):
+            pos = self.free_cells.sample(self.rng)
+            if pos is None:
+                return None
+            if pos not in standing:
+                self.free_cells.discard(pos)
+                return pos
+        return None
+
+    def guide_for(self, agent, goal):
+        # Distance field towards the agent's current goal, reused while the
+        # goal holds; a hole's is the fleet's delivery field
+        if goal in agent.delivery_fields:
+            return agent.prepare_delivery(goal)
+        field = self.guides.get(agent)
+        if field is None or field.goal != goal:
+            field = FlowField(agent.search, goal, agent.belief_obstacles)
+            self.guides[agent] = field
+        else:
+            field.refresh(agent.belief_obstacles)
+        return field
+
+    def drop_plan(self, agent):
+        plan = self.plans.pop(agent, None)
+        if plan is not None:
+            goal, first_tick, cells = plan
+            for dt, pos in enumerate(cells):
+                self.reservations.release(agent, first_tick + dt, agent.search.index(pos))
+
+    def book(self, agent, goal, cells, hold=True):
+        tick = self.ticks + 1
+        idx = agent.search.index(cells[-1])
+        # Hold the last cell to the end of the window so nobody plans into a parked agent
+        while hold and len(cells) < self.window and self.reservations.is_free(agent, tick + len(cells), idx):
+            cells.append(cells[-1])
+        for dt, pos in enumerate(cells):
+            self.reservations.reserve(agent, tick + dt, agent.search.index(pos))
+        self.plans[agent] = (goal, tick, cells)
+
+    def plan_valid(self, agent, goal):
+        plan = self.plans.get(agent)
+        if plan is None or plan[0] != goal or len(plan[2]) <= self.window // 2:
+            return False
+        if self.stalled.get(agent, 0) >= self.window:
+            return False
+        return all(pos == agent.pos or pos not in agent.belief_obstacles for pos in plan[2])
+
+    def dodge(self, agent, wander=False):
+        # No route to follow: stay put if nobody booked this cell, else step
+        # aside. A wandering agent prefers a random free neighbour, which
+        # breaks the head-on and cyclic deadlocks windowed planning can reach.
+        grid, table, tick = agent.search, self.reservations, self.ticks + 1
+        here = grid.index(agent.pos)
+        neighbors = [here + offset for offset in grid.offsets]
+        if wander:
+            self.rng.shuffle(neighbors)
+            candidates = neighbors + [here]
+        else:
+            candidates = [here] + neighbors
+        for idx in candidates:
+            if grid.blocked[idx] and idx != here:
+                continue
+            if not (table.is_free(agent, tick, idx) and table.is_free(agent, tick + 1, idx)):
+                continue
+            other = table.owner(tick - 1, idx)
+            if idx != here and other is not None and other is not agent and table.owner(tick, here) is other:
+                continue
+            return [grid.position(idx)]
+        return [agent.pos]
+
+    def plan_moves(self):
+        table, tick = self.reservations, self.ticks
+        table.expire(tick + 1)
+
+        goals = {}
+        replanning = []
+        for agent in self.agents:
+            agent.search.sync(agent.belief_obstacles)
+            if agent.path and agent.path[0] == agent.pos:
+                agent.path.pop(0)
+            goals[agent] = agent.path[-1] if agent.path else None
+            if not self.plan_valid(agent, goals[agent]):
+                self.drop_plan(agent)
+                replanning.append(agent)
+
+        # Agents about to replan still occupy their cells on the next tick
+        # unless a committed route already claimed it
+        for agent in replanning:
+            idx = agent.search.index(agent.pos)
+            if table.owner(tick + 1, idx) is None:
+                table.reserve(agent, tick + 1, idx)
+
+        for agent in replanning:
+            grid = agent.search
+            table.release(agent, tick + 1, grid.index(agent.pos))
+            goal, cells = goals[agent], []
+            if self.stalled.get(agent, 0) >= self.window:
+                # Stuck for a whole window: take one random step, replan next tick
+                self.stalled[agent] = 0
+                self.book(agent, goal, self.dodge(agent, wander=True), hold=False)
+                continue
+            if goal is not None:
+                guide = self.guide_for(agent, goal)
+                cells = cooperative_path(grid, agent.pos, guide, table, agent, tick, self.window)
+            if not cells:
+                cells = self.dodge(agent)
+            self.book(agent, goal, cells)
+
+        return {agent: self.plans[agent][2][0] for agent in self.agents}
+
+    def resolve_conflicts(self, moves):
+        # Safety net for anything the reservations did not foresee: a later
+        # agent gives way until no two agents share a cell or swap places
+        changed = True
+        while changed:
+            changed = False
+            taken = {}
+            for agent in self.agents:
+                target = moves[agent]
+                other = taken.get(target)
+                if other is None:
+                    taken[target] = agent
+                    continue
+                loser = agent if moves[agent] != agent.pos else other
+                moves[loser] = loser.pos
+                changed = True
+                break
+            if changed:
+                continue
+            for agent in self.agents:
+                other = taken.get(agent.pos)
+                if other is not None and other is not agent and moves[agent] == other.pos:
+                    moves[agent] = agent.pos
+                    changed = True
+                    break
+
+    def step(self):
+        if len(self.boxes) < len(self.agents):
+            self.spawn_box_hole()
+
+        for agent in self.agents:
+            agent.update_intelligence(self.boxes, self.holes)
+
+        moves = self.plan_moves()
+        # A step into an obstacle the agent has not discovered yet only
+        # teaches it about the obstacle, so everyone else must see it stay put
+        bumps = {}
+        for agent, target in moves.items():
+            if self.environment.is_obstacle(target):
+                bumps[agent] = target
+                moves[agent] = agent.pos
+        self.resolve_conflicts(moves)
+
+        for agent in self.agents:
+            target = moves[agent]
+            goal, first_tick, cells = self.plans[agent]
+            if target == cells[0]:
+                self.plans[agent] = (goal, first_tick + 1, cells[1:])
+            else:
+                # Held back by the safety net: the booked route is stale
+                self.drop_plan(agent)
+            if agent in bumps:
+                agent.path = [bumps[agent]]
+                agent.execute_movement()
+            elif target == agent.pos:
+                if goal is not None:
+                    self.stalled[agent] = self.stalled.get(agent, 0) + 1
+            else:
+                self.stalled[agent] = 0
+                if not agent.path or agent.path[0] != target:
+                    # Detour around other agents: rejoin the route from the new cell
+                    if goal is not None:
+                        agent.path = self.guide_for(agent, goal).path_from(target)
+                    if not agent.path:
+                        agent.path = [target]
+                if agent.execute_movement():
+                    self.metrics.total_steps_taken += 1
+            if agent.handle_pickup(self.boxes):
+                self.free_cells.add(agent.pos)
+            if agent.handle_drop(self.holes):
+                self.free_cells.add(agent.pos)
+
+        self.clock.advance()
+        self.metrics.tasks_completed = sum(agent.tasks_completed for agent in self.agents)
+        self.metrics.efficiency_score = sum(agent.efficiency_score for agent in self.agents)
+        self.metrics.simulated_seconds = self.time / 1000
+
+
+if __name__ == "__main__":
+    import time
+    for count in (1, 4, 16, 32):
+        started = time.perf_counter()
+        fleet = Fleet(agent_count=count, seed=1).run()
+        elapsed = time.perf_counter() - started
+        print(f"{count} agents: {fleet.metrics.tasks_completed} tasks, "
+              f"{fleet.metrics.throughput:.2f} tasks/s simulated, "
+              f"{fleet.ticks / elapsed:.0f} ticks/s wall")
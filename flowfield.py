@@ -0,0 +1,161 @@
+import heapq
+from array import array
+
+UNREACHABLE = 0x7fffffff
+
+
+# Reverse distance field towards one static goal (a hole) over a GridSearch
+# mask. It is built once with a breadth-first pass from the goal and then
+# repaired from the belief journal: a freed cell only lowers distances around
+# it, a new obstacle only re-labels the cells whose shortest routes all ran
+# through it. Reading the next move is a lookup on four neighbours.
+class FlowField:
+    def __init__(self, grid, goal, obstacles):
+        self.grid = grid
+        self.goal = goal
+        self.goal_idx = grid.index(goal)
+        self.dist = array('i', [UNREACHABLE]) * grid.size
+        self.version = None
+        self.refresh(obstacles)
+
+    def rebuild(self):
+        grid, dist = self.grid, self.dist
+        blocked, offsets = grid.blocked, grid.offsets
+        dist[:] = array('i', [UNREACHABLE]) * grid.size
+        if blocked[self.goal_idx]:
+            return
+        dist[self.goal_idx] = 0
+        frontier = [self.goal_idx]
+        level = 0
+        while frontier:
+            level += 1
+            next_frontier = []
+            for current in frontier:
+                for offset in offsets:
+                    neighbor = current + offset
+                    if not blocked[neighbor] and dist[neighbor] == UNREACHABLE:
+                        dist[neighbor] = level
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+
+    def refresh(self, obstacles):
+        # The GridSearch mask must already be synced with `obstacles`
+        if self.version == obstacles.version:
+            return
+        changes = None
+        if self.version is not None:
+            changes = obstacles.changes_since(self.version)
+        self.version = obstacles.version
+        if changes is None:
+            self.rebuild()
+            return
+
+        grid = self.grid
+        changed = {grid.index(pos) for pos in changes if grid.in_bounds(pos)}
+        if self.goal_idx in changed:
+            self.rebuild()
+            return
+        # New obstacles first, so freed cells are lowered from settled distances
+        self.block([idx for idx in changed if grid.blocked[idx]])
+        self.unblock([idx for idx in changed if not grid.blocked[idx]])
+
+    def lower_from(self, heap):
+        dist, blocked, offsets = self.dist, self.grid.blocked, self.grid.offsets
+        heapq.heapify(heap)
+        while heap:
+            d, current = heapq.heappop(heap)
+            if d != dist[current]:
+                continue
+            for offset in offsets:
+                neighbor = current + offset
+                if not blocked[neighbor] and dist[neighbor] > d + 1:
+                    dist[neighbor] = d + 1
+                    heapq.heappush(heap, (d + 1, neighbor))
+
+    def best_neighbor_distance(self, idx, exclude=()):
+        dist, blocked = self.dist, self.grid.blocked
+        best = UNREACHABLE
+        for offset in self.grid.offsets:
+            neighbor = idx + offset
+            if not blocked[neighbor] and neighbor not in exclude and dist[neighbor] < best:
+                best = dist[neighbor]
+        return best
+
+    def unblock(self, cells):
+        dist = self.dist
+        heap = []
+        for idx in cells:
+            best = self.best_neighbor_distance(idx)
+            if best != UNREACHABLE and best + 1 < dist[idx]:
+                dist[idx] = best + 1
+                heap.append((best + 1, idx))
+        self.lower_from(heap)
+
+    def block(self, cells):
+        dist, blocked, offsets = self.dist, self.grid.blocked, self.grid.offsets
+        # Cells left without any neighbour one step closer to the goal, found
+        # in order of distance outwards from the new obstacles
+        orphans = {idx for idx in cells if dist[idx] != UNREACHABLE}
+        queue = [(dist[idx], idx) for idx in orphans]
+        heapq.heapify(queue)
+        while queue:
+            level, current = heapq.heappop(queue)
+            level += 1
+            for offset in offsets:
+                neighbor = current + offset
+                if blocked[neighbor] or neighbor in orphans or dist[neighbor] != level:
+                    continue
+                supported = False
+                for support_offset in offsets:
+                    support = neighbor + support_offset
+                    if (not blocked[support] and support not in orphans
+                            and dist[support] == level - 1):
+                        supported = True
+                        break
+                if not supported:
+                    orphans.add(neighbor)
+                    heapq.heappush(queue, (level, neighbor))
+
+        for orphan in orphans:
+            dist[orphan] = UNREACHABLE
+        heap = []
+        for orphan in orphans:
+            if blocked[orphan]:
+                continue
+            best = self.best_neighbor_distance(orphan)
+            if best != UNREACHABLE:
+                dist[orphan] = best + 1
+                heap.append((best + 1, orphan))
+        self.lower_from(heap)
+
+    def distance(self, pos):
+        grid = self.grid
+        if not grid.in_bounds(pos):
+            return UNREACHABLE
+        idx = grid.index(pos)
+        if idx == self.goal_idx:
+            return 0 if not grid.blocked[idx] else UNREACHABLE
+        if grid.blocked[idx]:
+            # Standing on a believed obstacle: leaving it is still allowed
+            best = self.best_neighbor_distance(idx)
+            return best + 1 if best != UNREACHABLE else UNREACHABLE
+        return self.dist[idx]
+
+    def next_step(self, pos):
+        grid = self.grid
+        idx = grid.index(pos)
+        best, best_dist = None, UNREACHABLE
+        for offset in grid.offsets:
+            neighbor = idx + offset
+            if not grid.blocked[neighbor] and self.dist[neighbor] < best_dist:
+                best, best_dist = neighbor, self.dist[neighbor]
+        return grid.position(best) if best is not None else None
+
+    def path_from(self, pos):
+        if self.distance(pos) == UNREACHABLE:
+            return []
+        path = [pos]
+        while pos != self.goal:
+            pos = self.next_step(pos)
+            path.append(pos)
+        return path
@@ -0,0 +1,77 @@
+from array import array
+
+
+# Cells a box or hole can spawn on: free of obstacles, reachable from where
+# the agents start, and not already holding a box or hole. The cells live in a
+# dense array and every cell's slot in that array is kept in a second array the
+# size of the map (-1 when absent). Taking a cell swaps the last entry into its
+# slot, so adding, removing and drawing a uniformly random cell are all O(1)
+# whatever the size of the map.
+class FreeCells:
+    def __init__(self, environment):
+        self.width = environment.width
+        self.items = array('i')
+        self.slots = array('i', [-1]) * environment.size
+
+    @classmethod
+    def reachable(cls, environment, starts):
+        # Breadth-first pass over the true map from every start
+        width, size = environment.width, environment.size
+        seen = bytearray(environment.cells)
+        index = cls(environment)
+        frontier = []
+        for x, y in starts:
+            idx = y * width + x
+            if not seen[idx]:
+                seen[idx] = 1
+                frontier.append(idx)
+        while frontier:
+            next_frontier = []
+            for idx in frontier:
+                index.add_index(idx)
+                x = idx % width
+                for neighbor, valid in ((idx - 1, x > 0), (idx + 1, x < width - 1),
+                                        (idx - width, idx >= width), (idx + width, idx + width < size)):
+                    if valid and not seen[neighbor]:
+                        seen[neighbor] = 1
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+        return index
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, pos):
+        return self.slots[pos[1] * self.width + pos[0]] >= 0
+
+    def add_index(self, idx):
+        if self.slots[idx] < 0:
+            self.slots[idx] = len(self.items)
+            self.items.append(idx)
+
+    def add(self, pos):
+        self.add_index(pos[1] * self.width + pos[0])
+
+    def discard(self, pos):
+        idx = pos[1] * self.width + pos[0]
+        slot = self.slots[idx]
+        if slot < 0:
+            return
+        self.slots[idx] = -1
+        last = self.items.pop()
+        if last != idx:
+            self.items[slot] = last
+            self.slots[last] = slot
+
+    def sample(self, rng):
+        # A uniformly random cell, or None when there is none left
+        if not self.items:
+            return None
+        y, x = divmod(self.items[rng.randrange(len(self.items))], self.width)
+        return (x, y)
+
+    def take(self, rng):
+        pos = self.sample(rng)
+        if pos is not None:
+            self.discard(pos)
+        return pos
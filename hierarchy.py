@@ -0,0 +1,272 @@
+import heapq
+from array import array
+
+# Side of the square chunks the map is cut into
+CLUSTER_SIZE = 16
+# A shared stretch of free border this long or longer gets an entrance at
+# each end instead of one in the middle
+WIDE_ENTRANCE = 6
+
+
+# Hierarchical path-finding (HPA*) over a GridSearch mask. The map is cut
+# into square clusters. Where two neighbouring clusters share free border
+# cells, entrance cells are placed on both sides, and every pair of entrances
+# inside a cluster is joined by an edge carrying their distance within the
+# cluster. A query connects start and goal to the entrances of their own
+# clusters, searches this small abstract graph, and only then runs short
+# searches inside the clusters the abstract path passes through.
+#
+# The graph follows the belief journal: a changed cell only rebuilds its own
+# cluster, plus the neighbouring one when it lies on their shared border.
+class Hierarchy:
+    def __init__(self, grid, cluster_size=CLUSTER_SIZE):
+        self.grid = grid
+        self.cluster_size = cluster_size
+        self.columns = -(-grid.width // cluster_size)
+        self.rows = -(-grid.height // cluster_size)
+
+        # Cluster of every padded cell, -1 on the border padding
+        self.cluster = array('i', [-1]) * grid.size
+        for y in range(grid.height):
+            row = (y + 1) * grid.stride + 1
+            base = (y // cluster_size) * self.columns
+            for x in range(grid.width):
+                self.cluster[row + x] = base + x // cluster_size
+
+        self.seen = array('I', bytes(4 * grid.size))
+        self.parent = array('i', bytes(4 * grid.size))
+        self.stamp = 0
+        # (cluster, right or lower neighbour) -> [(cell, cell across)]
+        self.borders = {}
+        # entrance -> entrances across the border, and per cluster
+        # entrance -> [(entrance, steps)] inside it
+        self.inter = {}
+        self.intra = [{} for _ in range(self.columns * self.rows)]
+        self.version = None
+
+    def bounds(self, cluster):
+        cy, cx = divmod(cluster, self.columns)
+        x0, y0 = cx * self.cluster_size, cy * self.cluster_size
+        return (x0, y0, min(x0 + self.cluster_size, self.grid.width),
+                min(y0 + self.cluster_size, self.grid.height))
+
+    def rebuild(self):
+        self.borders.clear()
+        self.inter.clear()
+        for cluster in range(self.columns * self.rows):
+            cy, cx = divmod(cluster, self.columns)
+            if cx + 1 < self.columns:
+                self.build_border(cluster, cluster + 1)
+            if cy + 1 < self.rows:
+                self.build_border(cluster, cluster + self.columns)
+        for cluster in range(self.columns * self.rows):
+            self.build_edges(cluster)
+
+    def refresh(self, obstacles):
+        # The GridSearch mask must already be synced with `obstacles`
+        if self.version == obstacles.version:
+            return
+        changes = None if self.version is None else obstacles.changes_since(self.version)
+        self.version = obstacles.version
+        if changes is None:
+            self.rebuild()
+            return
+
+        grid, size, columns = self.grid, self.cluster_size, self.columns
+        dirty, borders = set(), set()
+        for pos in changes:
+            if not grid.in_bounds(pos):
+                continue
+            x, y = pos
+            cluster = self.cluster[grid.index(pos)]
+            dirty.add(cluster)
+            # A cell on the edge of its cluster also changes the entrances
+            # shared with the cluster across that edge
+            if x % size == 0 and x > 0:
+                borders.add((cluster - 1, cluster))
+            if x % size == size - 1 and x + 1 < grid.width:
+                borders.add((cluster, cluster + 1))
+            if y % size == 0 and y > 0:
+                borders.add((cluster - columns, cluster))
+            if y % size == size - 1 and y + 1 < grid.height:
+                borders.add((cluster, cluster + columns))
+        for a, b in borders:
+            self.build_border(a, b)
+            dirty.update((a, b))
+        for cluster in dirty:
+            self.build_edges(cluster)
+
+    def build_border(self, a, b):
+        grid, blocked, stride = self.grid, self.grid.blocked, self.grid.stride
+        for cell, across in self.borders.pop((a, b), ()):
+            self.unlink(cell, across)
+            self.unlink(across, cell)
+
+        x0, y0, x1, y1 = self.bounds(a)
+        if b == a + 1 and b % self.columns:
+            first, step, across, length = grid.index((x1 - 1, y0)), stride, 1, y1 - y0
+        else:
+            first, step, across, length = grid.index((x0, y1 - 1)), 1, stride, x1 - x0
+        pairs = []
+        run = []
+        for i in range(length + 1):
+            cell = first + i * step
+            if i < length and not blocked[cell] and not blocked[cell + across]:
+                run.append(cell)
+                continue
+            if run:
+                ends = (run[0], run[-1]) if len(run) >= WIDE_ENTRANCE else (run[len(run) // 2],)
+                pairs.extend((end, end + across) for end in ends)
+                run = []
+        for cell, other in pairs:
+            self.inter.setdefault(cell, []).append(other)
+            self.inter.setdefault(other, []).append(cell)
+        if pairs:
+            self.borders[(a, b)] = pairs
+
+    def unlink(self, cell, other):
+        partners = self.inter.get(cell)
+        if partners is not None:
+            partners.remove(other)
+            if not partners:
+                del self.inter[cell]
+
+    def entrances(self, cluster):
+        cluster_of = self.cluster
+        found = set()
+        for key in ((cluster - 1, cluster), (cluster, cluster + 1),
+                    (cluster - self.columns, cluster), (cluster, cluster + self.columns)):
+            for cell, across in self.borders.get(key, ()):
+                found.add(cell if cluster_of[cell] == cluster else across)
+        return found
+
+    def build_edges(self, cluster):
+        nodes = self.entrances(cluster)
+        edges = self.intra[cluster] = {}
+        for node in nodes:
+            reached = self.spread(node, nodes)
+            edges[node] = [(other, steps) for other, steps in reached.items() if other != node]
+
+    def spread(self, source, targets):
+        # Breadth-first search from source that never leaves its cluster,
+        # stopped once every target is reached; returns {target: steps}.
+        # The source itself may be blocked, as with GridSearch.
+        blocked, offsets, cluster_of = self.grid.blocked, self.grid.offsets, self.cluster
+        seen, parent = self.seen, self.parent
+        self.stamp += 1
+        stamp = self.stamp
+        cluster = cluster_of[source]
+        seen[source] = stamp
+        parent[source] = -1
+        found = {}
+        remaining = len(targets)
+        if source in targets:
+            found[source] = 0
+            remaining -= 1
+        frontier = [source]
+        dist = 0
+        while frontier and remaining:
+            dist += 1
+            next_frontier = []
+            for current in frontier:
+                for offset in offsets:
+                    neighbor = current + offset
+                    if blocked[neighbor] or seen[neighbor] == stamp or cluster_of[neighbor] != cluster:
+                        continue
+                    seen[neighbor] = stamp
+                    parent[neighbor] = current
+                    next_frontier.append(neighbor)
+                    if neighbor in targets:
+                        found[neighbor] = dist
+                        remaining -= 1
+            frontier = next_frontier
+        return found
+
+    def find_path(self, start, goal):
+        # Same contract as GridSearch.find_path on the synced mask, but the
+        # path is only near-shortest: it runs through entrance cells
+        grid = self.grid
+        if not (grid.in_bounds(start) and grid.in_bounds(goal)):
+            return []
+        start_idx, goal_idx = grid.index(start), grid.index(goal)
+        if grid.blocked[goal_idx]:
+            return []
+        if start_idx == goal_idx:
+            return [start]
+
+        # Temporary edges from the start and into the goal. A blocked start
+        # may only be left across its cluster's border, where no entrance
+        # is, so its free neighbours in other clusters join in as well.
+        extra = {}
+        self.attach(start_idx, goal_idx, extra)
+        if grid.blocked[start_idx]:
+            for offset in grid.offsets:
+                neighbor = start_idx + offset
+                if self.cluster[neighbor] not in (-1, self.cluster[start_idx]) and not grid.blocked[neighbor]:
+                    extra[start_idx].append((neighbor, 1))
+                    self.attach(neighbor, goal_idx, extra)
+        for node, steps in self.spread(goal_idx, self.entrances(self.cluster[goal_idx])).items():
+            extra.setdefault(node, []).append((goal_idx, steps))
+
+        route = self.abstract_path(start_idx, goal_idx, extra)
+        if route is None:
+            return []
+        path = [start]
+        for current, following in zip(route, route[1:]):
+            if self.cluster[current] == self.cluster[following]:
+                path.extend(self.refine(current, following))
+            else:
+                path.append(grid.position(following))
+        return path
+
+    def attach(self, source, goal, extra):
+        # Edges from source to the entrances of its cluster, and to the goal
+        # when it shares the cluster
+        targets = self.entrances(self.cluster[source])
+        if self.cluster[goal] == self.cluster[source]:
+            targets.add(goal)
+        extra.setdefault(source, []).extend(self.spread(source, targets).items())
+
+    def abstract_path(self, start, goal, extra):
+        intra, inter, cluster_of, stride = self.intra, self.inter, self.cluster, self.grid.stride
+        gy, gx = divmod(goal, stride)
+        g = {start: 0}
+        parent = {start: None}
+        closed = set()
+        # Ties on f go to the deeper entry: on open floor many routes are
+        # equally short and only one of them needs following
+        heap = [(0, 0, start)]
+        while heap:
+            _, _, current = heapq.heappop(heap)
+            if current in closed:
+                continue
+            closed.add(current)
+            if current == goal:
+                route = []
+                while current is not None:
+                    route.append(current)
+                    current = parent[current]
+                route.reverse()
+                return route
+            edges = intra[cluster_of[current]].get(current, [])
+            edges = edges + [(other, 1) for other in inter.get(current, ())] + extra.get(current, [])
+            for neighbor, steps in edges:
+                new_g = g[current] + steps
+                if neighbor in closed or new_g >= g.get(neighbor, new_g + 1):
+                    continue
+                g[neighbor] = new_g
+                parent[neighbor] = current
+                ny, nx = divmod(neighbor, stride)
+                heapq.heappush(heap, (new_g + abs(nx - gx) + abs(ny - gy), -new_g, neighbor))
+        return None
+
+    def refine(self, source, target):
+        # Cells after source up to and including target, staying in their cluster
+        self.spread(source, {target})
+        parent, position = self.parent, self.grid.position
+        cells = []
+        while target != source:
+            cells.append(position(target))
+            target = parent[target]
+        cells.reverse()
+        return cells
@@ -0,0 +1,156 @@
+import heapq
+
+INF = float('inf')
+
+
+# D* Lite over a GridSearch mask. The search runs backwards from the goal and
+# keeps its g/rhs values between calls, so when the agent moves or a few
+# cells change in the belief map only the inconsistent region around the
+# change is re-expanded. Entering a blocked cell costs infinity; leaving one
+# is allowed, matching a_star_pathfind when the agent stands on a believed
+# obstacle.
+class DStarLite:
+    def __init__(self, grid, goal, version=0):
+        self.grid = grid
+        self.goal = goal
+        self.goal_idx = grid.index(goal)
+        self.version = version
+        self.reset()
+
+    def reset(self):
+        self.g = {}
+        self.rhs = {self.goal_idx: 0}
+        self.queued = {}
+        self.heap = []
+        self.km = 0
+        self.last_start = None
+        self.expansions = 0
+
+    def heuristic(self, a, b):
+        ay, ax = divmod(a, self.grid.stride)
+        by, bx = divmod(b, self.grid.stride)
+        return abs(ax - bx) + abs(ay - by)
+
+    def calculate_key(self, idx, start_idx):
+        best = min(self.g.get(idx, INF), self.rhs.get(idx, INF))
+        return (best + self.heuristic(start_idx, idx) + self.km, best)
+
+    def push(self, idx, key):
+        self.queued[idx] = key
+        heapq.heappush(self.heap, (key[0], key[1], idx))
+
+    def top(self):
+        heap, queued = self.heap, self.queued
+        while heap:
+            k1, k2, idx = heap[0]
+            if queued.get(idx) == (k1, k2):
+                return (k1, k2), idx
+            heapq.heappop(heap)
+        return (INF, INF), None
+
+    def update_vertex(self, idx, start_idx):
+        grid = self.grid
+        if idx != self.goal_idx:
+            best = INF
+            blocked, g = grid.blocked, self.g
+            for offset in grid.offsets:
+                succ = idx + offset
+                if not blocked[succ]:
+                    cost = g.get(succ, INF) + 1
+                    if cost < best:
+                        best = cost
+            self.rhs[idx] = best
+        self.queued.pop(idx, None)
+        if self.g.get(idx, INF) != self.rhs.get(idx, INF):
+            self.push(idx, self.calculate_key(idx, start_idx))
+
+    def is_inner(self, idx):
+        y, x = divmod(idx, self.grid.stride)
+        return 0 < x <= self.grid.width and 0 < y <= self.grid.height
+
+    def compute_shortest_path(self, start_idx):
+        g, rhs, grid = self.g, self.rhs, self.grid
+        blocked, offsets = grid.blocked, grid.offsets
+        while True:
+            k_old, u = self.top()
+            start_key = self.calculate_key(start_idx, start_idx)
+            if not (k_old < start_key or rhs.get(start_idx, INF) != g.get(start_idx, INF)):
+                break
+            if u is None:
+                break
+            heapq.heappop(self.heap)
+            del self.queued[u]
+            self.expansions += 1
+
+            k_new = self.calculate_key(u, start_idx)
+            if k_old < k_new:
+                self.push(u, k_new)
+            elif g.get(u, INF) > rhs.get(u, INF):
+                g[u] = rhs[u]
+                if not blocked[u]:
+                    for offset in offsets:
+                        pred = u + offset
+                        if self.is_inner(pred):
+                            self.update_vertex(pred, start_idx)
+            else:
+                g[u] = INF
+                self.update_vertex(u, start_idx)
+                if not blocked[u]:
+                    for offset in offsets:
+                        pred = u + offset
+                        if self.is_inner(pred):
+                            self.update_vertex(pred, start_idx)
+
+    def update(self, obstacles, start):
+        # Replays belief changes since the last call; the mask itself must
+        # already be synced (GridSearch.sync) before this runs
+        changes = obstacles.changes_since(self.version)
+        self.version = obstacles.version
+        if changes is None:
+            self.reset()
+            return
+        if not changes or self.last_start is None:
+            return
+        start_idx = self.grid.index(start)
+        for pos in changes:
+            if not self.grid.in_bounds(pos):
+                continue
+            idx = self.grid.index(pos)
+            for offset in self.grid.offsets:
+                pred = idx + offset
+                if self.is_inner(pred):
+                    self.update_vertex(pred, start_idx)
+
+    def plan(self, start):
+        grid = self.grid
+        if not grid.in_bounds(start):
+            return []
+        start_idx = grid.index(start)
+        if self.last_start is None:
+            self.push(self.goal_idx, (self.heuristic(start_idx, self.goal_idx), 0))
+        elif start_idx != self.last_start:
+            self.km += self.heuristic(self.last_start, start_idx)
+        self.last_start = start_idx
+
+        self.compute_shortest_path(start_idx)
+        if self.rhs.get(start_idx, INF) == INF or grid.blocked[self.goal_idx]:
+            return []
+
+        path = [start]
+        current = start_idx
+        blocked, g, offsets = grid.blocked, self.g, grid.offsets
+        for _ in range(grid.size):
+            if current == self.goal_idx:
+                return path
+            best, best_cost = None, INF
+            for offset in offsets:
+                succ = current + offset
+                if not blocked[succ]:
+                    cost = g.get(succ, INF)
+                    if cost < best_cost:
+                        best, best_cost = succ, cost
+            if best is None:
+                return []
+            current = best
+            path.append(grid.position(current))
+        return []
@@ -0,0 +1,101 @@
+from array import array
+
+# Landmarks kept per map, and how many of them guide one search
+LANDMARK_COUNT = 8
+ACTIVE_LANDMARKS = 3
+# New obstacles tolerated before the tables are rebuilt to tighten the bounds
+REBUILD_AFTER = 256
+# Table entry for a cell the landmark cannot reach; real distances are
+# capped one below it, which keeps every bound a lower bound
+UNREACHED = 0xffff
+
+
+# Landmark (ALT) lower bounds on path length. From each of a few landmark
+# cells, spread far apart over the agent's part of the map, a BFS distance to
+# every cell is stored as an unsigned short. By the triangle inequality
+# |d(L, a) - d(L, b)| can never exceed the distance from a to b, and around
+# walls it is far closer to it than Manhattan distance.
+#
+# The tables are only rebuilt when they could mislead a planner. Obstacles
+# learned after a build only make routes longer, so the old bounds stay
+# admissible (just looser) until REBUILD_AFTER of them have piled up; a
+# believed obstacle that turns out to be free may shorten a route, so it
+# forces a rebuild before the next query.
+class Landmarks:
+    def __init__(self, grid, count=LANDMARK_COUNT):
+        self.grid = grid
+        self.count = count
+        self.tables = []
+        self.cells = []
+        self.version = None
+        self.added = 0
+
+    def refresh(self, obstacles, start):
+        # The GridSearch mask must already be synced with `obstacles`; start
+        # picks which part of the map the landmarks cover
+        if self.version == obstacles.version:
+            return
+        changes = None if self.version is None else obstacles.changes_since(self.version)
+        self.version = obstacles.version
+        if changes is not None and all(pos in obstacles for pos in changes):
+            self.added += len(changes)
+            if self.added < REBUILD_AFTER:
+                return
+        self.rebuild(start)
+
+    def rebuild(self, start):
+        # Farthest-point placement: each landmark goes to the cell farthest
+        # from every landmark placed so far
+        self.tables, self.cells, self.added = [], [], 0
+        if not self.grid.in_bounds(start):
+            return
+        nearest = self.spread(self.grid.index(start))
+        nearest = array('H', [0 if d == UNREACHED else d for d in nearest])
+        for _ in range(self.count):
+            farthest = max(nearest)
+            if farthest == 0:
+                break
+            source = nearest.index(farthest)
+            table = self.spread(source)
+            self.tables.append(table)
+            self.cells.append(source)
+            nearest = array('H', map(min, nearest, table))
+
+    def spread(self, source):
+        blocked, offsets = self.grid.blocked, self.grid.offsets
+        table = array('H', [UNREACHED]) * self.grid.size
+        table[source] = 0
+        frontier = [source]
+        dist = 0
+        while frontier:
+            dist = min(dist + 1, UNREACHED - 1)
+            next_frontier = []
+            for current in frontier:
+                for offset in offsets:
+                    neighbor = current + offset
+                    if not blocked[neighbor] and table[neighbor] == UNREACHED:
+                        table[neighbor] = dist
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+        return table
+
+    def toward(self, start_idx, goal_idx, active=ACTIVE_LANDMARKS):
+        # (table, distance of the goal) for the landmarks that bound this
+        # query best at its start; planners fold these into their heuristic
+        # inline, so every extra landmark costs on every push
+        scored = []
+        for table in self.tables:
+            to_goal, from_start = table[goal_idx], table[start_idx]
+            if to_goal != UNREACHED and from_start != UNREACHED:
+                scored.append((abs(from_start - to_goal), table, to_goal))
+        scored.sort(key=lambda entry: entry[0], reverse=True)
+        return [(table, to_goal) for _, table, to_goal in scored[:active]]
+
+    def bound(self, a, b):
+        # Lower bound on the steps between padded cells a and b
+        best = 0
+        for table in self.tables:
+            da, db = table[a], table[b]
+            if da != UNREACHED and db != UNREACHED and abs(da - db) > best:
+                best = abs(da - db)
+        return best
@@ -0,0 +1,342 @@
+import heapq
+from array import array
+from landmarks import UNREACHED
+
+
+# Grid search over a flat index space. The grid is padded with a one-cell
+# border that is permanently blocked, so a neighbour of any inner cell is just
+# idx + offset and never needs a bounds check. Per-search state (g-score,
+# parent) lives in preallocated arrays tagged with a search id, so starting a
+# new search costs nothing and the path is only built once the goal is reached.
+class GridSearch:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.stride = width + 2
+        self.size = self.stride * (height + 2)
+        self.offsets = (-1, 1, -self.stride, self.stride)
+
+        self.blocked = bytearray(self.size)
+        for x in range(self.stride):
+            self.blocked[x] = 1
+            self.blocked[self.size - 1 - x] = 1
+        for y in range(height + 2):
+            self.blocked[y * self.stride] = 1
+            self.blocked[y * self.stride + self.stride - 1] = 1
+        self.marked = set()
+        self.synced_source = None
+        self.synced_version = None
+
+        self.g = array('i', bytes(4 * self.size))
+        self.parent = array('i', bytes(4 * self.size))
+        self.seen = array('I', bytes(4 * self.size))
+        self.closed = array('I', bytes(4 * self.size))
+        self.search_id = 0
+        # Nodes taken off the open list by the last find_path or find_jump_path
+        self.expanded = 0
+
+    def index(self, pos):
+        return (pos[1] + 1) * self.stride + pos[0] + 1
+
+    def position(self, idx):
+        y, x = divmod(idx, self.stride)
+        return (x - 1, y - 1)
+
+    def in_bounds(self, pos):
+        return 0 <= pos[0] < self.width and 0 <= pos[1] < self.height
+
+    def sync(self, obstacles):
+        # Bring the mask in line with an obstacle set. A journaled set
+        # (belief.BeliefObstacles) is replayed from the last synced version;
+        # anything else is compared against the cells marked so far.
+        blocked, marked = self.blocked, self.marked
+        version = getattr(obstacles, 'version', None)
+        if version is not None and obstacles is self.synced_source:
+            if version == self.synced_version:
+                return
+            changes = obstacles.changes_since(self.synced_version)
+            if changes is not None:
+                for pos in changes:
+                    if not self.in_bounds(pos):
+                        continue
+                    if pos in obstacles:
+                        blocked[self.index(pos)] = 1
+                        marked.add(pos)
+                    else:
+                        blocked[self.index(pos)] = 0
+                        marked.discard(pos)
+                self.synced_version = version
+                return
+
+        removed = [pos for pos in marked if pos not in obstacles]
+        for pos in removed:
+            blocked[self.index(pos)] = 0
+            marked.discard(pos)
+        for pos in obstacles:
+            if pos not in marked and self.in_bounds(pos):
+                blocked[self.index(pos)] = 1
+                marked.add(pos)
+        self.synced_source = obstacles
+        self.synced_version = version
+
+    def load(self, cells):
+        # Overwrite the mask with a row-major width*height obstacle bitmap
+        # (BeliefObstacles.grid). A mask filled this way is only ever
+        # refilled by load, since sync() no longer knows which cells it set.
+        width, stride = self.width, self.stride
+        for y in range(self.height):
+            row = (y + 1) * stride + 1
+            self.blocked[row:row + width] = cells[y * width:(y + 1) * width]
+        self.marked.clear()
+        self.synced_source = None
+        self.synced_version = None
+
+    def reconstruct(self, idx):
+        parent = self.parent
+        path = []
+        while idx >= 0:
+            path.append(self.position(idx))
+            idx = parent[idx]
+        path.reverse()
+        return path
+
+    def levels(self, start, obstacles=None):
+        # Breadth-first expansion from start, yielding (distance, cells) one
+        # ring at a time so callers can stop as soon as they have seen enough.
+        # path_to() can rebuild the route to any yielded cell until the next
+        # search runs.
+        if obstacles is not None:
+            self.sync(obstacles)
+        if not self.in_bounds(start):
+            return
+
+        self.search_id += 1
+        sid = self.search_id
+        blocked, g, parent, seen, offsets = self.blocked, self.g, self.parent, self.seen, self.offsets
+
+        start_idx = self.index(start)
+        g[start_idx] = 0
+        parent[start_idx] = -1
+        seen[start_idx] = sid
+        frontier = [start_idx]
+        dist = 0
+        while frontier:
+            yield dist, frontier
+            dist += 1
+            next_frontier = []
+            for current in frontier:
+                for offset in offsets:
+                    neighbor = current + offset
+                    if blocked[neighbor] or seen[neighbor] == sid:
+                        continue
+                    seen[neighbor] = sid
+                    g[neighbor] = dist
+                    parent[neighbor] = current
+                    next_frontier.append(neighbor)
+            frontier = next_frontier
+
+    def distances(self, start, targets, obstacles=None, nearest_only=False):
+        # Distance field from start, stopped as soon as every target (or, with
+        # nearest_only, the first one) has been reached. Returns
+        # {target: steps} for the reachable targets.
+        wanted = {self.index(pos): pos for pos in targets if self.in_bounds(pos)}
+        result = {}
+        for dist, frontier in self.levels(start, obstacles):
+            for idx in frontier:
+                if idx in wanted:
+                    result[wanted.pop(idx)] = dist
+                    if nearest_only:
+                        return result
+            if not wanted:
+                break
+        return result
+
+    def path_to(self, goal):
+        if not self.in_bounds(goal):
+            return []
+        idx = self.index(goal)
+        if self.seen[idx] != self.search_id:
+            return []
+        return self.reconstruct(idx)
+
+    def find_path(self, start, goal, obstacles=None, landmarks=None):
+        # A* with Manhattan distance, raised by landmark bounds when a
+        # landmarks.Landmarks built on this grid is given
+        if obstacles is not None:
+            self.sync(obstacles)
+        if not (self.in_bounds(start) and self.in_bounds(goal)):
+            return []
+        start_idx, goal_idx = self.index(start), self.index(goal)
+        if self.blocked[goal_idx]:
+            return []
+
+        self.search_id += 1
+        sid = self.search_id
+        blocked, g, parent, seen, closed = self.blocked, self.g, self.parent, self.seen, self.closed
+        offsets, stride, size = self.offsets, self.stride, self.size
+        gx, gy = goal[0] + 1, goal[1] + 1
+        bounds = landmarks.toward(start_idx, goal_idx) if landmarks is not None else ()
+
+        # Heap entries are packed as f * size + idx: no tuples, and g lives in the array
+        g[start_idx] = 0
+        parent[start_idx] = -1
+        seen[start_idx] = sid
+        heap = [start_idx]
+        expanded = 0
+        while heap:
+            current = heapq.heappop(heap) % size
+            if closed[current] == sid:
+                continue
+            closed[current] = sid
+            expanded += 1
+            if current == goal_idx:
+                self.expanded = expanded
+                return self.reconstruct(current)
+
+            new_g = g[current] + 1
+            for offset in offsets:
+                neighbor = current + offset
+                if blocked[neighbor] or closed[neighbor] == sid:
+                    continue
+                if seen[neighbor] == sid and g[neighbor] <= new_g:
+                    continue
+                seen[neighbor] = sid
+                g[neighbor] = new_g
+                parent[neighbor] = current
+                ny, nx = divmod(neighbor, stride)
+                h = abs(nx - gx) + abs(ny - gy)
+                for table, to_goal in bounds:
+                    d = table[neighbor]
+                    if d != UNREACHED and abs(d - to_goal) > h:
+                        h = abs(d - to_goal)
+                heapq.heappush(heap, (new_g + h) * size + neighbor)
+        self.expanded = expanded
+        return []
+
+    def jump_across(self, idx, step, goal_idx):
+        # Walk sideways from idx until the goal, a wall, or a cell where a
+        # side neighbour opens up that the cell behind could not reach. Such
+        # a cell sits just past a blocked run in the row above or below, so
+        # the rows are searched with bytearray.find instead of cell by cell.
+        blocked, stride = self.blocked, self.stride
+        if step > 0:
+            wall = blocked.find(1, idx + 1)
+            found = goal_idx if idx < goal_idx < wall else wall
+            for side in (-stride, stride):
+                run = blocked.find(1, idx + side, found + side)
+                if run >= 0:
+                    opening = blocked.find(0, run, found + side)
+                    if opening >= 0:
+                        found = opening - side
+        else:
+            wall = blocked.rfind(1, 0, idx)
+            found = goal_idx if wall < goal_idx < idx else wall
+            for side in (-stride, stride):
+                run = blocked.rfind(1, found + side + 1, idx + side + 1)
+                if run >= 0:
+                    opening = blocked.rfind(0, found + side + 1, run)
+                    if opening >= 0:
+                        found = opening - side
+        return -1 if found == wall else found
+
+    def jump_along(self, idx, step, goal_idx):
+        # Walk up or down from idx. Besides its own forced neighbours, a cell
+        # is a jump point when a sideways walk from it finds one.
+        blocked, jump_across = self.blocked, self.jump_across
+        while True:
+            idx += step
+            if blocked[idx]:
+                return -1
+            if idx == goal_idx:
+                return idx
+            if ((not blocked[idx - 1] and blocked[idx - 1 - step])
+                    or (not blocked[idx + 1] and blocked[idx + 1 - step])):
+                return idx
+            if jump_across(idx, 1, goal_idx) >= 0 or jump_across(idx, -1, goal_idx) >= 0:
+                return idx
+
+    def find_jump_path(self, start, goal, obstacles=None, landmarks=None, stop=None):
+        # Jump Point Search for the 4-connected grid: same result as
+        # find_path, but runs of open floor are crossed by straight jumps
+        # between jump points instead of expanding every cell on them.
+        # stop(), when given, is polled every 256 expansions; a search it
+        # ends returns None
+        if obstacles is not None:
+            self.sync(obstacles)
+        if not (self.in_bounds(start) and self.in_bounds(goal)):
+            return []
+        start_idx, goal_idx = self.index(start), self.index(goal)
+        if self.blocked[goal_idx]:
+            return []
+
+        self.search_id += 1
+        sid = self.search_id
+        g, parent, seen, closed = self.g, self.parent, self.seen, self.closed
+        stride, size = self.stride, self.size
+        jump_across, jump_along = self.jump_across, self.jump_along
+        gx, gy = goal[0] + 1, goal[1] + 1
+        bounds = landmarks.toward(start_idx, goal_idx) if landmarks is not None else ()
+
+        g[start_idx] = 0
+        parent[start_idx] = -1
+        seen[start_idx] = sid
+        heap = [start_idx]
+        expanded = 0
+        while heap:
+            current = heapq.heappop(heap) % size
+            if closed[current] == sid:
+                continue
+            closed[current] = sid
+            expanded += 1
+            if current == goal_idx:
+                self.expanded = expanded
+                return self.expand(self.reconstruct(current))
+            if stop is not None and not expanded & 0xff and stop():
+                self.expanded = expanded
+                return None
+
+            # Keep going the way we came, or turn; never go back
+            came = current - parent[current] if parent[current] >= 0 else 0
+            if came == 0:
+                steps = (1, -1, stride, -stride)
+            elif -stride < came < stride:
+                steps = (1 if came > 0 else -1, stride, -stride)
+            else:
+                steps = (stride if came > 0 else -stride, 1, -1)
+            for step in steps:
+                if step == 1 or step == -1:
+                    point = jump_across(current, step, goal_idx)
+                    if point < 0:
+                        continue
+                    new_g = g[current] + abs(point - current)
+                else:
+                    point = jump_along(current, step, goal_idx)
+                    if point < 0:
+                        continue
+                    new_g = g[current] + abs(point - current) // stride
+                if closed[point] == sid or (seen[point] == sid and g[point] <= new_g):
+                    continue
+                seen[point] = sid
+                g[point] = new_g
+                parent[point] = current
+                py, px = divmod(point, stride)
+                h = abs(px - gx) + abs(py - gy)
+                for table, to_goal in bounds:
+                    d = table[point]
+                    if d != UNREACHED and abs(d - to_goal) > h:
+                        h = abs(d - to_goal)
+                # Packed as in find_path, with ties on f going to the larger g
+                heapq.heappush(heap, ((new_g + h) * size + size - new_g) * size + point)
+        self.expanded = expanded
+        return []
+
+    def expand(self, points):
+        # Fill in the cells on the straight runs between jump points
+        path = points[:1]
+        for x, y in points[1:]:
+            px, py = path[-1]
+            dx, dy = (x > px) - (x < px), (y > py) - (y < py)
+            while (px, py) != (x, y):
+                px, py = px + dx, py + dy
+                path.append((px, py))
+        return path
@@ -0,0 +1,467 @@
+from pathfinding import GridSearch
+from incremental import DStarLite
+from flowfield import FlowField
+from connectivity import Components
+from hierarchy import Hierarchy
+from landmarks import Landmarks
+from anytime import AnytimeSearch
+from background import BackgroundPlanner
+from tasks import TaskIndex, score_tasks
+from belief import BeliefObstacles, VisitCounts
+
+# Simulated ms during which a (start, goal) pair that found no path is not
+# searched again
+RETRY_AFTER = 5000
+# Ticks the agent spends planning at least before it takes a background answer
+PLANNING_TICKS = 1
+# Cells the speculative task search may visit per tick during a delivery
+SPECULATION_BUDGET = 256
+
+
+# Beliefs, route planning and task choice shared by the base and the enhanced
+# agent. Every planner runs behind guarded(), which gives them one contract;
+# the agents themselves only add how they sense, move and show what they do.
+class PlanningAgent:
+    def __init__(self, start_pos, environment, clock, pathfinder, make_task):
+        self.pos = start_pos
+        self.carrying = None
+        self.path = []
+        self.visited_positions = VisitCounts(environment.width, environment.height)
+        self.failed_attempts = {}
+        self.task_queue = []
+        self.task_index = TaskIndex(make_task)
+        self.claims = None
+        self.current_task = None
+        self.efficiency_score = 0
+        self.tasks_completed = 0
+        self.true_env = environment
+        self.belief_obstacles = BeliefObstacles(environment.width, environment.height)
+        self.clock = clock
+        self.search = GridSearch(environment.width, environment.height)
+        self.components = Components(self.search)
+        self.pathfinder = pathfinder
+        self.planner = None
+        self.hierarchy = None
+        self.landmarks = None
+        self.anytime = None
+        self.planning = False
+        self.background = None
+        self.pending = None
+        # Whether a background answer due after PLANNING_TICKS is waited for;
+        # only runs that draw nothing between ticks should
+        self.wait_for_worker = False
+        self.scored_path = None
+        self.speculation = None
+        # Mask the delivery fields are built over; a fleet shares one
+        self.field_grid = self.search
+        self.delivery_fields = {}
+        self.idle_key = None
+
+    def manhattan_distance(self, pos1, pos2):
+        return abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1])
+
+    def can_reach(self, goal):
+        # Whether the believed map has any route to goal at all, without
+        # searching for one
+        self.search.sync(self.belief_obstacles)
+        self.components.refresh(self.belief_obstacles)
+        return self.components.reachable(self.pos, goal)
+
+    def guarded(self, start, goal, obstacles, search):
+        # The contract of every planner. Standing on the goal is a path of
+        # its own; a pair that failed within RETRY_AFTER is not searched
+        # again; from the agent's own cell on its belief map, a goal the
+        # components rule out fails without a search. Otherwise search(start,
+        # goal) returns the path (start included), [] when there is none, or
+        # None while it is still being planned, which sets self.planning.
+        self.planning = False
+        if start == goal:
+            return [start]
+        path_key = (start, goal)
+        if path_key in self.failed_attempts and self.clock.time - self.failed_attempts[path_key] < RETRY_AFTER:
+            return []
+        if obstacles is self.belief_obstacles and start == self.pos and not self.can_reach(goal):
+            self.failed_attempts[path_key] = self.clock.time
+            return []
+
+        path = search(start, goal)
+        if path is None:
+            self.planning = True
+            return []
+        if not path:
+            self.failed_attempts[path_key] = self.clock.time
+        return path
+
+    def a_star_pathfind(self, start, goal, obstacles):
+        return self.guarded(start, goal, obstacles,
+                            lambda start, goal: self.search.find_path(start, goal, obstacles))
+
+    def jps_pathfind(self, start, goal, obstacles):
+        # a_star_pathfind with Jump Point Search: same paths, far fewer
+        # expansions across open floor
+        return self.guarded(start, goal, obstacles,
+                            lambda start, goal: self.search.find_jump_path(start, goal, obstacles))
+
+    def alt_pathfind(self, start, goal, obstacles):
+        # a_star_pathfind guided by landmark distances on the belief map,
+        # which see around the walls that mislead Manhattan distance
+        def search(start, goal):
+            landmarks = None
+            if obstacles is self.belief_obstacles and start == self.pos:
+                if self.landmarks is None:
+                    self.landmarks = Landmarks(self.search)
+                self.landmarks.refresh(obstacles, start)
+                landmarks = self.landmarks
+            return self.search.find_path(start, goal, obstacles, landmarks)
+        return self.guarded(start, goal, obstacles, search)
+
+    def anytime_pathfind(self, goal):
+        # One expansion budget of the anytime search per call. Returns the
+        # route of its first finished round, or [] with self.planning set
+        # while that round is still running
+        return self.guarded(self.pos, goal, self.belief_obstacles, self.anytime_route)
+
+    def anytime_route(self, start, goal):
+        if self.anytime is None:
+            self.anytime = AnytimeSearch(self.search)
+        search = self.anytime
+        # A finished search has no rounds left to hand back, so a new request
+        # for the same goal and beliefs starts it over from where we stand
+        if search.finished or search.goal != goal or search.version != self.belief_obstacles.version:
+            search.reset(goal, start, self.belief_obstacles.version)
+        route = search.advance(start)
+        if route is None:
+            return []
+        return route or None
+
+    def improve_route(self, goal):
+        # Later rounds of the anytime search run while the agent walks; a
+        # shorter route from where it stands replaces the rest of its path
+        search = self.anytime
+        if search is None or search.goal != goal or search.finished:
+            return
+        self.search.sync(self.belief_obstacles)
+        route = search.advance(self.pos)
+        if not route or any(cell in self.belief_obstacles for cell in route):
+            return
+        remaining = len(self.path) - (self.path[0] == self.pos)
+        if len(route) - 1 < remaining:
+            self.path = route[1:]
+
+    def background_pathfind(self, goal):
+        # The search runs on a worker thread while the agent stays in the
+        # planning state; it takes the answer on the first tick the worker
+        # has it, and no sooner than PLANNING_TICKS. With wait_for_worker it
+        # takes it after exactly PLANNING_TICKS, so a run repeats tick for
+        # tick. A request for an older start, goal or belief version is
+        # replaced.
+        return self.guarded(self.pos, goal, self.belief_obstacles, self.background_route)
+
+    def background_route(self, start, goal):
+        future = self.background_answer(
+            ("route", start, goal, self.belief_obstacles.version),
+            lambda planner: planner.submit_route(start, goal, self.belief_obstacles))
+        return future.result() if future is not None else None
+
+    def background_answer(self, request, submit):
+        # The future for request once it may be taken, or None while the
+        # agent is still planning. Any other request replaces the pending one
+        # and stops its search; submit(planner) sends the new one to the worker.
+        if self.pending is not None and self.pending[1] == request:
+            future, _, ready_tick = self.pending
+            if self.clock.ticks < ready_tick or not (self.wait_for_worker or future.done()):
+                return None
+            self.pending = None
+            return future
+        self.pending = (submit(self.background_planner()), request, self.clock.ticks + PLANNING_TICKS)
+        return None
+
+    def background_planner(self):
+        if self.background is None:
+            self.background = BackgroundPlanner(self.true_env.width, self.true_env.height)
+        return self.background
+
+    def incremental_pathfind(self, goal):
+        # Keeps the D* Lite search for the committed goal and repairs it from the
+        # belief changes since the last call instead of searching from scratch
+        return self.guarded(self.pos, goal, self.belief_obstacles, self.incremental_route)
+
+    def incremental_route(self, start, goal):
+        if self.planner is None or self.planner.goal != goal:
+            self.planner = DStarLite(self.search, goal, self.belief_obstacles.version)
+        else:
+            self.planner.update(self.belief_obstacles, start)
+        return self.planner.plan(start)
+
+    def hierarchical_pathfind(self, goal):
+        # Plans over the HPA* cluster graph, which is built on first use and
+        # afterwards only rebuilt around belief changes
+        return self.guarded(self.pos, goal, self.belief_obstacles, self.hierarchical_route)
+
+    def hierarchical_route(self, start, goal):
+        if self.hierarchy is None:
+            self.hierarchy = Hierarchy(self.search)
+        self.hierarchy.refresh(self.belief_obstacles)
+        return self.hierarchy.find_path(start, goal)
+
+    def close(self):
+        # Stops the worker thread of the background planner, if one started
+        if self.background is not None:
+            self.background.shutdown()
+            self.background = None
+        self.pending = None
+
+    def replan(self, goal):
+        # Route to goal with the planner chosen for this run
+        if self.pathfinder == "hpa":
+            return self.hierarchical_pathfind(goal)
+        if self.pathfinder == "jps":
+            return self.jps_pathfind(self.pos, goal, self.belief_obstacles)
+        if self.pathfinder == "alt":
+            return self.alt_pathfind(self.pos, goal, self.belief_obstacles)
+        if self.pathfinder == "anytime":
+            return self.anytime_pathfind(goal)
+        if self.pathfinder == "background":
+            return self.background_pathfind(goal)
+        return self.incremental_pathfind(goal)
+
+    def prepare_delivery(self, hole_pos):
+        # Holes do not move, so each keeps a reverse distance field that is built
+        # once and afterwards only repaired from belief changes
+        self.field_grid.sync(self.belief_obstacles)
+        field = self.delivery_fields.get(hole_pos)
+        if field is None:
+            field = self.delivery_fields[hole_pos] = FlowField(self.field_grid, hole_pos, self.belief_obstacles)
+        else:
+            field.refresh(self.belief_obstacles)
+        return field
+
+    def notice_box(self, pos, color):
+        self.task_index.add_box(pos, color)
+
+    def delivery_route(self, holes):
+        # Route from here to the nearest of holes along their delivery
+        # fields; with the background planner the worker builds and reads
+        # them, and the route is [] with self.planning set until it answers
+        self.planning = False
+        if self.pathfinder == "background":
+            request = ("delivery", self.pos, tuple(holes), self.belief_obstacles.version)
+            future = self.background_answer(
+                request, lambda planner: planner.submit_delivery(self.pos, holes, self.belief_obstacles))
+            if future is None:
+                self.planning = True
+                return []
+            return future.result() or []
+        fields = [self.prepare_delivery(hole_pos) for hole_pos in holes]
+        nearest = min(fields, key=lambda field: field.distance(self.pos))
+        return nearest.path_from(self.pos)
+
+    def notice_hole(self, pos, color):
+        # The worker builds its own fields when it plans in the background
+        if self.pathfinder != "background":
+            self.prepare_delivery(pos)
+        self.task_index.add_hole(pos, color)
+
+    def sync_tasks(self, boxes, holes):
+        if not self.task_index.in_sync(boxes, holes):
+            self.task_index.sync(boxes, holes)
+            for hole_pos in [p for p in self.delivery_fields if p not in self.task_index.hole_colors]:
+                del self.delivery_fields[hole_pos]
+
+    def evaluate_tasks(self, boxes, holes):
+        self.task_queue.clear()
+        self.sync_tasks(boxes, holes)
+        floor = self.task_index.min_delivery()
+        if floor is None:
+            return
+        # Nothing changed since the last search came up empty, so skip it
+        idle_key = (self.pos, self.belief_obstacles.version, self.task_index.version)
+        if idle_key == self.idle_key:
+            return
+        if self.pathfinder == "background":
+            best = self.background_task(idle_key, floor)
+            if best is None and self.planning:
+                return
+        else:
+            best = self.best_task(self.pos, floor)
+        if best is not None:
+            self.task_queue.append(best)
+        else:
+            self.idle_key = idle_key
+
+    def background_task(self, request, floor):
+        # best_task from here scored on the worker, which also sends the
+        # route to the task's box for task_path(). Sets self.planning until
+        # the answer is in
+        self.planning = False
+        future = self.background_answer(
+            ("task",) + request,
+            lambda planner: planner.submit_scan(self.pos, floor, self.candidates(self.pos),
+                                                set(self.task_index.hole_colors), self.belief_obstacles))
+        if future is None:
+            self.planning = True
+            return None
+        found = future.result()
+        if found is None:
+            return None
+        task = self.scored(found)
+        if self.claims is not None and self.claims.get(task.box_pos, self) is not self:
+            # Claimed by another agent since it was sent: score again
+            self.planning = True
+            return None
+        self.scored_path = found[3]
+        return task
+
+    def task_path(self, task):
+        # Route to the box of the task just taken from the queue: the one it
+        # was scored with on the worker, or else the last search's
+        path, self.scored_path = self.scored_path, None
+        if path and path[-1] == task.box_pos:
+            return path
+        return self.search.path_to(task.box_pos)
+
+    def best_task(self, origin, floor, skip_hole=None):
+        # Grow one distance field from origin and score boxes as it reaches
+        # them; stop once even the cheapest delivery left cannot beat the best.
+        # Boxes in another component are dropped up front, so the search never
+        # floods the agent's whole component looking for them. Tasks into
+        # skip_hole are left out. path_to() gives the route from origin to the
+        # chosen box until the next search runs.
+        return self.run_scan(self.scan_tasks(origin, floor, skip_hole))[1]
+
+    def run_scan(self, scan, budget=None):
+        # Advances a scan_tasks generator until it has visited budget cells,
+        # or to the end without a budget. Returns (finished, best task)
+        spent = 0
+        try:
+            while budget is None or spent < budget:
+                spent += next(scan)
+        except StopIteration as done:
+            return True, done.value
+        return False, None
+
+    def scan_tasks(self, origin, floor, skip_hole=None):
+        # best_task one ring of the distance field at a time: yields the
+        # cells of each ring scored and returns the best task
+        found = yield from score_tasks(self.search, self.belief_obstacles, origin, floor,
+                                       self.candidates(origin, skip_hole),
+                                       lambda hole_pos, box_pos: self.prepare_delivery(hole_pos).distance(box_pos))
+        return self.scored(found)
+
+    def candidates(self, origin, skip_hole=None):
+        # The boxes in origin's component, each with its penalty for a route
+        # that failed from origin and the tasks it may be used for: none when
+        # another agent claimed it, and none into skip_hole
+        self.can_reach(origin)
+        reachable = self.components.reachable
+        candidates = {}
+        for box_pos in self.task_index.box_colors:
+            if not reachable(origin, box_pos):
+                continue
+            tasks = []
+            if self.claims is None or self.claims.get(box_pos, self) is self:
+                tasks = [task for task in self.task_index.tasks_for_box(box_pos) if task.hole_pos != skip_hole]
+            penalty = 50 if (origin, box_pos) in self.failed_attempts else 0
+            candidates[box_pos] = (penalty, tasks)
+        return candidates
+
+    def scored(self, found):
+        # The task of a score_tasks result, with its estimate set
+        if found is None:
+            return None
+        task, cost, steps = found[:3]
+        task.estimated_steps, task.priority = steps, cost
+        return task
+
+    def may_speculate(self):
+        # Whether the next task may be chosen before the drop; agents that
+        # can be handed a task from outside say no while one is pending
+        return True
+
+    def speculate(self, boxes, holes):
+        # Every tick of a delivery, choose the next task and its route as if
+        # the box were already dropped, so the agent can set off again
+        # straight from the hole. The search runs SPECULATION_BUDGET cells a
+        # tick and starts over when a belief, box or hole it depends on
+        # changes, or when another search has used the grid in between.
+        hole = self.path[-1]
+        self.sync_tasks(boxes, holes)
+        if not self.may_speculate() or self.task_index.hole_colors.get(hole) != self.carrying:
+            self.speculation = None
+            return
+        # The drop removes the hole from the index, one version on
+        key = (hole, self.belief_obstacles.version, self.task_index.version + 1)
+        speculation = self.speculation
+        if speculation is not None and speculation[:3] == key:
+            if speculation[3] is None or self.pathfinder == "background":
+                return
+            if speculation[4] == self.search.search_id:
+                self.advance_speculation(SPECULATION_BUDGET)
+                return
+        self.speculation = None
+        floor = self.task_index.min_delivery()
+        if floor is None:
+            return
+        if self.pathfinder == "background":
+            # The whole scan runs on the worker, and stops any pending
+            # request; take_speculation hands it on to evaluate_tasks
+            future = self.background_planner().submit_scan(
+                hole, floor, self.candidates(hole, skip_hole=hole),
+                set(self.task_index.hole_colors), self.belief_obstacles)
+            self.pending = None
+            self.speculation = key + (future, None, None, None)
+            return
+        self.speculation = key + (self.scan_tasks(hole, floor, skip_hole=hole), None, None, None)
+        self.advance_speculation(SPECULATION_BUDGET)
+
+    def advance_speculation(self, budget=None):
+        # Runs the speculative scan on; once it finishes, the scan is
+        # replaced by the task it chose and the route to that task's box
+        hole, belief_version, index_version, scan, _, _, _ = self.speculation
+        finished, task = self.run_scan(scan, budget)
+        path = self.search.path_to(task.box_pos) if task is not None else None
+        if finished:
+            self.speculation = (hole, belief_version, index_version, None, None, task, path)
+        else:
+            self.speculation = (hole, belief_version, index_version, scan, self.search.search_id, None, None)
+
+    def take_speculation(self, boxes, holes):
+        # The route chosen during the delivery, if the agent stands on its
+        # hole and no belief, box, hole or claim has changed since; the task
+        # is queued as evaluate_tasks would have done. A scan the delivery
+        # left unfinished is finished here; one sent to the worker becomes the
+        # answer evaluate_tasks takes. None otherwise.
+        if self.speculation is None or not self.may_speculate():
+            self.speculation = None
+            return None
+        hole, belief_version, index_version, scan, search_id = self.speculation[:5]
+        self.sync_tasks(boxes, holes)
+        if (hole != self.pos or belief_version != self.belief_obstacles.version
+                or index_version != self.task_index.version
+                or (search_id is not None and search_id != self.search.search_id)):
+            self.speculation = None
+            return None
+        if self.pathfinder == "background":
+            self.speculation = None
+            self.pending = (scan, ("task", hole, belief_version, index_version), self.clock.ticks)
+            return None
+        if scan is not None:
+            self.advance_speculation()
+        task, path = self.speculation[5:]
+        self.speculation = None
+        if task is None:
+            return None
+        if self.claims is not None and self.claims.get(task.box_pos, self) is not self:
+            return None
+        self.task_queue[:] = [task]
+        return path
+
+    def select_next_task(self):
+        # evaluate_tasks only queues a task whose box the agent can reach
+        if self.task_queue:
+            task = self.task_queue.pop(0)
+            if self.claims is not None:
+                # Shared with the rest of a fleet so no two agents chase one box
+                self.claims[task.box_pos] = self
+            return task
+        return None
@@ -0,0 +1,53 @@
+import time
+
+
+# Drives a headless Simulation against the wall clock with a fixed timestep.
+# Real time elapsed since the last frame, times `speed`, is added to an
+# accumulator and paid out in whole simulation ticks of sim.tick_ms, so the
+# simulation runs at the same rate however fast or slow frames are drawn.
+# Frames are then drawn at up to `fps` per second. Each frame gets the
+# fraction of a tick left in the accumulator, for interpolating between the
+# last two ticks. When stepping cannot keep up within a frame's budget, the
+# backlog is dropped: the simulation slows down instead of the display
+# freezing.
+class RealtimeLoop:
+    def __init__(self, sim, speed=1.0, fps=60, timer=time.perf_counter, sleep=time.sleep):
+        self.sim = sim
+        self.speed = speed
+        self.fps = fps
+        self.timer = timer
+        self.sleep = sleep
+        self.accumulator = 0.0
+        self.frames = 0
+
+    def advance(self, elapsed_ms, on_tick=None):
+        # Run the ticks owed for `elapsed_ms` of real time; returns how far
+        # into the next tick the simulation is, between 0 and 1
+        sim = self.sim
+        self.accumulator += elapsed_ms * self.speed
+        deadline = self.timer() + 1.0 / self.fps
+        while self.accumulator >= sim.tick_ms and not sim.finished:
+            sim.step()
+            self.accumulator -= sim.tick_ms
+            if on_tick is not None:
+                on_tick(sim)
+            if self.timer() > deadline:
+                self.accumulator = 0.0
+                break
+        return self.accumulator / sim.tick_ms
+
+    def run(self, frame, on_tick=None):
+        # frame(sim, alpha) draws one frame; on_tick(sim) runs after every tick
+        frame_s = 1.0 / self.fps
+        last = self.timer()
+        frame(self.sim, 0.0)
+        while not self.sim.finished:
+            now = self.timer()
+            alpha = self.advance((now - last) * 1000, on_tick)
+            last = now
+            frame(self.sim, alpha)
+            self.frames += 1
+            remaining = frame_s - (self.timer() - now)
+            if remaining > 0:
+                self.sleep(remaining)
+        return self.sim
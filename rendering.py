@@ -1,51 +1,85 @@
 import pygame
-from constants import TILE_SIZE, SCREEN_WIDTH, SCREEN_HEIGHT, COLORS
-
-def draw_enhanced(agent, boxes, holes, obstacles, screen):
-    font = pygame.font.SysFont(None, 20)
-    title_font = pygame.font.SysFont(None, 24)
-    screen.fill(COLORS['background'])
-
-    # Visited positions
-    for pos in agent.visited_positions:
-        pygame.draw.rect(screen, COLORS['visited'], (pos[0]*TILE_SIZE+2, pos[1]*TILE_SIZE+2, TILE_SIZE-4, TILE_SIZE-4))
-
-    # True obstacles (solid)
-    for (x, y) in obstacles:
-        pygame.draw.rect(screen, COLORS['obstacle'], (x*TILE_SIZE, y*TILE_SIZE, TILE_SIZE, TILE_SIZE))
-
-    # Belief-based obstacles (only if not already known as true obstacles)
-    for (x, y) in agent.belief_obstacles:
-        if (x, y) not in obstacles:
-            pygame.draw.rect(screen, (255, 0, 0), (x*TILE_SIZE+2, y*TILE_SIZE+2, TILE_SIZE-4, TILE_SIZE-4), 2)
-
-    # Holes
-    for (x, y), color in holes:
-        pygame.draw.circle(screen, COLORS[color], (x*TILE_SIZE+TILE_SIZE//2, y*TILE_SIZE+TILE_SIZE//2), TILE_SIZE//4)
-
-    # Boxes
-    for (x, y), color in boxes:
-        pygame.draw.rect(screen, COLORS[color], (x*TILE_SIZE+6, y*TILE_SIZE+6, TILE_SIZE-12, TILE_SIZE-12))
-        if agent.current_task and (x, y) == agent.current_task.box_pos:
-            pygame.draw.rect(screen, (255, 255, 255), (x*TILE_SIZE+4, y*TILE_SIZE+4, TILE_SIZE-8, TILE_SIZE-8), 2)
-
-    # Agent
-    ax, ay = agent.pos
-    agent_color = COLORS[agent.carrying] if agent.carrying else COLORS['agent']
-    pygame.draw.circle(screen, agent_color, (ax*TILE_SIZE+TILE_SIZE//2, ay*TILE_SIZE+TILE_SIZE//2), TILE_SIZE//2)
-
-    # Info panel
-    y_offset = 10
-    screen.blit(title_font.render("Intelligent Agent", True, (255, 255, 255)), (10, y_offset))
-    y_offset += 30
-
-    stats = [
-        f"Tasks Completed: {agent.tasks_completed}",
-        f"Carrying: {agent.carrying or 'Nothing'}",
-        f"Thought: {agent.thought}"
-    ]
-    for stat in stats:
-        screen.blit(font.render(stat, True, (200, 200, 200)), (10, y_offset))
-        y_offset += 20
-
-    pygame.display.flip()
+from constants import COLORS
+from tilecache import CachedRenderer
+
+
+class EnhancedRenderer(CachedRenderer):
+    def __init__(self, environment, screen):
+        super().__init__(environment, screen, COLORS['background'])
+        self.font = pygame.font.SysFont(None, 20)
+        self.title_font = pygame.font.SysFont(None, 24)
+        self.title = self.title_font.render("Intelligent Agent", True, (255, 255, 255))
+        self.texts = {}
+        self.agent = None
+        self.agent_pos = None
+        self.highlight = None
+
+    def draw_tile(self, surface, pos, x, y):
+        TILE_SIZE = self.tile
+        agent = self.agent
+        # Visited, true obstacles (solid), and belief-based obstacles that are
+        # not true obstacles
+        if pos in agent.visited_positions:
+            pygame.draw.rect(surface, COLORS['visited'], (x+2, y+2, TILE_SIZE-4, TILE_SIZE-4))
+        if self.environment.is_obstacle(pos):
+            pygame.draw.rect(surface, COLORS['obstacle'], (x, y, TILE_SIZE, TILE_SIZE))
+        elif pos in agent.belief_obstacles:
+            pygame.draw.rect(surface, (255, 0, 0), (x+2, y+2, TILE_SIZE-4, TILE_SIZE-4), 2)
+
+        # Holes
+        color = self.holes.get(pos)
+        if color:
+            pygame.draw.circle(surface, COLORS[color], (x+TILE_SIZE//2, y+TILE_SIZE//2), TILE_SIZE//4)
+
+        # Boxes
+        color = self.boxes.get(pos)
+        if color:
+            pygame.draw.rect(surface, COLORS[color], (x+6, y+6, TILE_SIZE-12, TILE_SIZE-12))
+            if pos == self.highlight:
+                pygame.draw.rect(surface, (255, 255, 255), (x+4, y+4, TILE_SIZE-8, TILE_SIZE-8), 2)
+
+    def text(self, line, text):
+        # Re-render a line of the info panel only when its text changed
+        cached = self.texts.get(line)
+        if cached is None or cached[0] != text:
+            cached = self.texts[line] = (text, self.font.render(text, True, (200, 200, 200)))
+        return cached[1]
+
+    def draw_sprites(self, screen):
+        TILE_SIZE = self.tile
+        agent = self.agent
+        rects = []
+
+        # Agent
+        ax, ay = self.view.to_screen(self.agent_pos)
+        agent_color = COLORS[agent.carrying] if agent.carrying else COLORS['agent']
+        rects.append(pygame.draw.circle(screen, agent_color, (ax+TILE_SIZE//2, ay+TILE_SIZE//2), TILE_SIZE//2))
+
+        # Info panel
+        y_offset = 10
+        rects.append(screen.blit(self.title, (10, y_offset)))
+        y_offset += 30
+
+        stats = [
+            f"Tasks Completed: {agent.tasks_completed}",
+            f"Carrying: {agent.carrying or 'Nothing'}",
+            f"Thought: {agent.thought}"
+        ]
+        for line, stat in enumerate(stats):
+            rects.append(screen.blit(self.text(line, stat), (10, y_offset)))
+            y_offset += 20
+        return rects
+
+    def draw(self, agent, boxes, holes, alpha=1.0):
+        self.agent = agent
+        self.agent_pos = self.agent_position(agent, alpha)
+        self.track(agent)
+        self.sync_beliefs(agent.belief_obstacles)
+        self.sync_items(boxes, holes)
+        highlight = agent.current_task.box_pos if agent.current_task else None
+        if highlight != self.highlight:
+            self.mark(self.highlight)
+            self.mark(highlight)
+            self.highlight = highlight
+        self.follow(agent.pos)
+        self.present()
@@ -0,0 +1,28 @@
+import math
+
+
+# Simulated time for one episode. Time is derived from the tick count rather
+# than accumulated, so a seed and a tick count pin down every timestamp the
+# agent and the scenario script see, whatever the frame rate.
+class SimClock:
+    def __init__(self, tick_ms):
+        self.tick_ms = tick_ms
+        self.ticks = 0
+
+    @property
+    def time(self):
+        return self.ticks * self.tick_ms
+
+    def advance(self):
+        self.ticks += 1
+
+    def boundaries(self, ticks, period, since):
+        # Multiples of `period` after `since` that fall before the start of tick `ticks`
+        elapsed = ticks * self.tick_ms - since
+        return math.ceil(elapsed / period) if elapsed > 0 else 0
+
+    def due(self, period, since=0):
+        # True on exactly one tick per period: the one whose span
+        # [time, time + tick_ms) contains since + k * period
+        return (self.boundaries(self.ticks + 1, period, since)
+                > self.boundaries(self.ticks, period, since))
@@ -0,0 +1,153 @@
+import heapq
+import itertools
+from flowfield import UNREACHABLE
+
+
+# Box/hole pairs indexed by colour and kept up to date as boxes and holes
+# appear and disappear, instead of being rebuilt from the lists on every
+# decision. Each pair gets one Task for its lifetime. A heap ordered by the
+# pair's Manhattan delivery distance (a lower bound on the real one) gives
+# the cheapest remaining delivery in O(1), which the agent uses to stop its
+# distance field early; pairs removed from the index stay in the heap until
+# they reach its top or outnumber the live ones. The version goes up with
+# every box or hole added or removed.
+class TaskIndex:
+    def __init__(self, make_task):
+        self.make_task = make_task
+        self.boxes = {}
+        self.holes = {}
+        self.box_colors = {}
+        self.hole_colors = {}
+        self.tasks = {}
+        self.heap = []
+        self.counter = itertools.count()
+        self.version = 0
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def add_task(self, box_pos, color, hole_pos):
+        delivery = abs(box_pos[0] - hole_pos[0]) + abs(box_pos[1] - hole_pos[1])
+        task = self.make_task(delivery, box_pos, color, hole_pos, delivery)
+        self.tasks[(box_pos, hole_pos)] = task
+        heapq.heappush(self.heap, (delivery, next(self.counter), task))
+
+    def add_box(self, pos, color):
+        if pos in self.box_colors:
+            return
+        self.version += 1
+        self.box_colors[pos] = color
+        self.boxes.setdefault(color, set()).add(pos)
+        for hole_pos in self.holes.get(color, ()):
+            self.add_task(pos, color, hole_pos)
+
+    def add_hole(self, pos, color):
+        if pos in self.hole_colors:
+            return
+        self.version += 1
+        self.hole_colors[pos] = color
+        self.holes.setdefault(color, set()).add(pos)
+        for box_pos in self.boxes.get(color, ()):
+            self.add_task(box_pos, color, pos)
+
+    def remove_box(self, pos):
+        color = self.box_colors.pop(pos, None)
+        if color is None:
+            return
+        self.version += 1
+        self.boxes[color].discard(pos)
+        for hole_pos in self.holes.get(color, ()):
+            self.tasks.pop((pos, hole_pos), None)
+        self.compact()
+
+    def remove_hole(self, pos):
+        color = self.hole_colors.pop(pos, None)
+        if color is None:
+            return
+        self.version += 1
+        self.holes[color].discard(pos)
+        for box_pos in self.boxes.get(color, ()):
+            self.tasks.pop((box_pos, pos), None)
+        self.compact()
+
+    def compact(self):
+        # Rebuild the heap from the live pairs once dead entries outnumber
+        # them, so it does not grow with every pair a long run has seen
+        if len(self.heap) <= 2 * len(self.tasks):
+            return
+        tasks = self.tasks
+        self.heap = [entry for entry in self.heap
+                     if tasks.get((entry[2].box_pos, entry[2].hole_pos)) is entry[2]]
+        heapq.heapify(self.heap)
+
+    def sync(self, boxes, holes):
+        # Fallback for lists changed behind the index's back
+        box_colors = dict(boxes)
+        hole_colors = dict(holes)
+        for pos in [p for p in self.box_colors if box_colors.get(p) != self.box_colors[p]]:
+            self.remove_box(pos)
+        for pos in [p for p in self.hole_colors if hole_colors.get(p) != self.hole_colors[p]]:
+            self.remove_hole(pos)
+        for pos, color in boxes:
+            self.add_box(pos, color)
+        for pos, color in holes:
+            self.add_hole(pos, color)
+
+    def in_sync(self, boxes, holes):
+        # The same cells with the same colours, so a box swapped for one of
+        # another colour is not missed
+        box_colors, hole_colors = self.box_colors, self.hole_colors
+        return (len(boxes) == len(box_colors) and len(holes) == len(hole_colors)
+                and all(box_colors.get(pos) == color for pos, color in boxes)
+                and all(hole_colors.get(pos) == color for pos, color in holes))
+
+    def tasks_for_box(self, pos):
+        color = self.box_colors.get(pos)
+        if color is None:
+            return []
+        return [self.tasks[(pos, hole_pos)] for hole_pos in self.holes.get(color, ())]
+
+    def min_delivery(self):
+        # Smallest Manhattan delivery distance among live pairs (lazy deletion)
+        heap, tasks = self.heap, self.tasks
+        while heap:
+            delivery, _, task = heap[0]
+            if tasks.get((task.box_pos, task.hole_pos)) is task:
+                return delivery
+            heapq.heappop(heap)
+        return None
+
+
+# Grows one distance field from origin over grid and scores boxes as it
+# reaches them; stops once even the cheapest delivery left (floor) cannot
+# beat the best. candidates maps each box worth reaching to its penalty and
+# the tasks it may be used for, and delivery(hole_pos, box_pos) gives a
+# task's delivery distance. Yields the cells of each ring scored and returns
+# (task, cost, steps) for the best task, or None. grid.path_to() gives the
+# route from origin to the chosen box until the next search runs.
+def score_tasks(grid, obstacles, origin, floor, candidates, delivery):
+    box_cells = {grid.index(pos): pos for pos in candidates}
+    remaining = len(box_cells)
+    if not remaining:
+        return None
+    best, best_cost, best_steps = None, None, None
+    for dist, frontier in grid.levels(origin, obstacles):
+        if not remaining or (best is not None and dist + floor >= best_cost):
+            break
+        yield len(frontier)
+        for idx in frontier:
+            box_pos = box_cells.get(idx)
+            if box_pos is None:
+                continue
+            remaining -= 1
+            penalty, tasks = candidates[box_pos]
+            for task in tasks:
+                steps = delivery(task.hole_pos, box_pos)
+                if steps == UNREACHABLE:
+                    continue
+                steps += dist
+                if best is None or steps + penalty < best_cost:
+                    best, best_cost, best_steps = task, steps + penalty, steps
+    if best is None:
+        return None
+    return best, best_cost, best_steps
@@ -0,0 +1,142 @@
+import pygame
+from viewport import Viewport
+
+
+# Renderer base that keeps the map in view pre-rendered in an off-screen
+# cache: background, obstacles and every other mark that belongs to a tile.
+# A tile is repainted into the cache only when it is marked dirty (the agent
+# moved over it, a box or hole came or went, a belief changed). Sprites drawn
+# on top each frame (the agent, its path, text, effects) are erased on the
+# next frame by copying the cache back over the rectangles they covered, and
+# only those rectangles are pushed with display.update, so a frame costs in
+# proportion to what changed rather than to the size of the map.
+#
+# Subclasses implement draw_tile(surface, pos, x, y) and draw_sprites(screen),
+# which returns the rectangles it drew. When the simulation runs on its own
+# timestep (realtime.RealtimeLoop), tick(agent) is called after every
+# simulation tick and frames place the agent part way along its last move.
+class CachedRenderer:
+    def __init__(self, environment, screen, background):
+        self.environment = environment
+        self.screen = screen
+        self.background = background
+        self.view = Viewport(environment, *screen.get_size())
+        self.tile = self.view.tile
+        self.cache = pygame.Surface(screen.get_size())
+        self.full_redraw = True
+        self.scrolled = False
+        self.dirty = set()
+        self.sprite_rects = []
+
+        self.last_seen = None
+        self.motion = None
+        self.belief_version = None
+        self.misbeliefs = set()
+        self.boxes = {}
+        self.holes = {}
+
+    def mark(self, pos):
+        if pos is not None:
+            self.dirty.add(pos)
+
+    def track(self, agent):
+        # Cheap enough to call every tick, so tiles crossed between two
+        # frames are repainted too. A visit is counted on the tick after the
+        # agent arrives, which also repaints the cell.
+        key = (agent.pos, agent.visited_positions.count(agent.pos))
+        if key != self.last_seen:
+            if self.last_seen is not None:
+                self.mark(self.last_seen[0])
+            self.mark(agent.pos)
+            self.last_seen = key
+
+    def tick(self, agent):
+        self.motion = (self.motion[1] if self.motion else agent.pos, agent.pos)
+        self.track(agent)
+
+    def agent_position(self, agent, alpha):
+        # Where to draw the agent `alpha` of the way through the current tick
+        if self.motion is None or self.motion[1] != agent.pos:
+            return agent.pos
+        (x0, y0), (x1, y1) = self.motion
+        return (x0 + (x1 - x0) * alpha, y0 + (y1 - y0) * alpha)
+
+    def sync_beliefs(self, beliefs):
+        environment = self.environment
+        changes = None
+        if self.belief_version is not None:
+            changes = beliefs.changes_since(self.belief_version)
+        self.belief_version = beliefs.version
+        if changes is None:
+            self.misbeliefs = {pos for pos in beliefs
+                               if environment.in_bounds(pos) and not environment.is_obstacle(pos)}
+            self.full_redraw = True
+            return
+        for pos in changes:
+            if not environment.in_bounds(pos):
+                continue
+            self.mark(pos)
+            if pos in beliefs and not environment.is_obstacle(pos):
+                self.misbeliefs.add(pos)
+            else:
+                self.misbeliefs.discard(pos)
+
+    def sync_items(self, boxes, holes):
+        for attr, items in (("boxes", boxes), ("holes", holes)):
+            old, new = getattr(self, attr), dict(items)
+            if old == new:
+                continue
+            for pos in old.keys() | new.keys():
+                if old.get(pos) != new.get(pos):
+                    self.mark(pos)
+            setattr(self, attr, new)
+
+    def follow(self, pos):
+        view = self.view
+        old_x, old_y = view.x, view.y
+        view.follow(pos)
+        dx, dy = view.x - old_x, view.y - old_y
+        if not (dx or dy) or self.full_redraw:
+            return
+        if abs(dx) >= view.cols or abs(dy) >= view.rows:
+            self.full_redraw = True
+            return
+        # Shift what is already rendered and paint only the strips that
+        # scrolled into view
+        self.cache.scroll(-dx * self.tile, -dy * self.tile)
+        self.scrolled = True
+        xs = range(view.x + view.cols - dx, view.x + view.cols) if dx > 0 else range(view.x, view.x - dx)
+        ys = range(view.y + view.rows - dy, view.y + view.rows) if dy > 0 else range(view.y, view.y - dy)
+        for x in xs:
+            for y in range(view.y, view.y + view.rows):
+                self.dirty.add((x, y))
+        for y in ys:
+            for x in range(view.x, view.x + view.cols):
+                self.dirty.add((x, y))
+
+    def paint(self, pos):
+        x, y = self.view.to_screen(pos)
+        rect = pygame.Rect(x, y, self.tile, self.tile)
+        self.cache.fill(self.background, rect)
+        self.draw_tile(self.cache, pos, x, y)
+        return rect
+
+    def present(self):
+        screen, cache, view = self.screen, self.cache, self.view
+        if self.full_redraw:
+            cache.fill(self.background)
+            for pos in view.cells():
+                self.paint(pos)
+            restore = [screen.get_rect()]
+        else:
+            restore = [self.paint(pos) for pos in self.dirty if view.contains(pos)]
+            restore.extend(self.sprite_rects)
+            if self.scrolled:
+                restore = [screen.get_rect()]
+        self.dirty.clear()
+        self.full_redraw = self.scrolled = False
+
+        for rect in restore:
+            screen.blit(cache, rect, rect)
+        self.sprite_rects = [rect for rect in self.draw_sprites(screen) if rect.width and rect.height]
+        pygame.display.update(restore + self.sprite_rects)
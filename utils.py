@@ -8,3 +8,19 @@ class Task:
     box_color: str
     hole_pos: Tuple[int, int]
     estimated_steps: int
+
+@dataclass
+class PerformanceMetrics:
+    tasks_completed: int = 0
+    total_steps_taken: int = 0
+    efficiency_score: int = 0
+    simulated_seconds: float = 0.0
+
+    @property
+    def steps_per_task(self) -> float:
+        return (self.total_steps_taken / self.tasks_completed) if self.tasks_completed > 0 else 0.0
+
+    @property
+    def throughput(self) -> float:
+        # Tasks completed per simulated second
+        return (self.tasks_completed / self.simulated_seconds) if self.simulated_seconds > 0 else 0.0
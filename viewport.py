@@ -0,0 +1,33 @@
+# The part of the map that fits on screen. Maps larger than the window scroll
+# to keep the agent in view, and a frame only touches the cells it shows, so
+# drawing costs the same on a 20x15 map and on a 1000x1000 one.
+class Viewport:
+    def __init__(self, environment, width, height):
+        self.environment = environment
+        self.tile = environment.tile_size
+        self.cols = min(environment.width, -(-width // self.tile))
+        self.rows = min(environment.height, -(-height // self.tile))
+        self.x = 0
+        self.y = 0
+
+    def follow(self, pos):
+        environment = self.environment
+        self.x = min(max(pos[0] - self.cols // 2, 0), environment.width - self.cols)
+        self.y = min(max(pos[1] - self.rows // 2, 0), environment.height - self.rows)
+
+    def cells(self):
+        for y in range(self.y, self.y + self.rows):
+            for x in range(self.x, self.x + self.cols):
+                yield x, y
+
+    def contains(self, pos):
+        return self.x <= pos[0] < self.x + self.cols and self.y <= pos[1] < self.y + self.rows
+
+    def to_screen(self, pos):
+        return ((pos[0] - self.x) * self.tile, (pos[1] - self.y) * self.tile)
+
+
+def screen_size(environment, max_width, max_height, extra_width=0):
+    # Window size for a map: the whole map when it fits, otherwise a scrolling view
+    return (min(environment.width * environment.tile_size, max_width) + extra_width,
+            min(environment.height * environment.tile_size, max_height))